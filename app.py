@@ -2,37 +2,36 @@ import streamlit as st
 from db.db_setup import init_db
 from modules.epic_form import show_epic_form
 from modules.epic_board import show_epic_board
-from db.db_manager import get_all_epics, get_epic_count_by_week
+from modules.debug_panel import show_debug_panel
+from modules.search_box import show_search_box
+from modules.diagnostics_panel import start_rerun_diagnostics, show_diagnostics_panel
+from db.db_manager import get_week_options
+from db.db_weeks import format_week_label, current_week
 
 st.set_page_config(page_title="Roadmap Semanal", layout="wide")
 
+# Medir las consultas de este rerun (solo si el diagnóstico está activo)
+start_rerun_diagnostics()
+
 # Inicializar DB
 init_db()
 
 st.title("Roadmap Semanal - Reunión de Lunes")
 
+# Buscador (sus resultados pueden cambiar la semana seleccionada)
+show_search_box()
+
 # Seleccionar semana
-week = st.selectbox("Selecciona la semana", ["Semana 40 - 2025", "Semana 41 - 2025", "Semana 42 - 2025"])
+weeks = get_week_options()
+st.session_state.setdefault("selected_week", format_week_label(*current_week()))
+if st.session_state["selected_week"] not in weeks:
+    weeks = weeks + [st.session_state["selected_week"]]
+week = st.selectbox("Selecciona la semana", weeks, key="selected_week")
 
 # Agregar panel de debug expandible
 with st.expander("" \
 "Panel de Debug - Ver todas las épicas"):
-    all_epics = get_all_epics()
-    st.write(f"**Total de épicas en la base de datos:** {len(all_epics)}")
-    
-    if all_epics:
-        st.write("**Todas las épicas:**")
-        for epic in all_epics:
-            st.write(f"- ID: {epic[0]} | Nombre: {epic[1]} | Semana: {epic[3]} | Estado: {epic[4]}")
-    else:
-        st.warning("⚠️ No hay épicas en la base de datos")
-    
-    # Contador por semana
-    week_counts = get_epic_count_by_week()
-    if week_counts:
-        st.write("**Épicas por semana:**")
-        for week_data in week_counts:
-            st.write(f"- {week_data[0]}: {week_data[1]} épicas")
+    show_debug_panel()
 
 tab1, tab2, tab3 = st.tabs(["📋 Tablero", "➕ Nueva épica", "📊 Reportes"])
 
@@ -45,3 +44,6 @@ with tab2:
 with tab3:
     from modules.reports_interface import show_reports_interface
     show_reports_interface()
+
+# Diagnóstico de consultas en la barra lateral (al final, para incluir todo el rerun)
+show_diagnostics_panel()
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Benchmark de las consultas críticas del roadmap
+Por defecto construye una base de datos temporal y compara el plan de consultas y los tiempos
+antes y después de aplicar las migraciones del esquema. Con --suite mide cada función de
+db_manager y el camino de datos del tablero sobre datasets de varios tamaños y guarda los
+percentiles en JSON para comparar entre commits.
+"""
+
+import argparse
+import datetime
+import inspect
+import itertools
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from db.db_setup import create_tables
+from db.db_migrations import migrate, get_schema_version
+from db.db_backend import configure_backend, get_db_path
+from db.db_backup import prune_snapshots
+from db.db_cache import get_cache
+from db.db_instrumentation import session as db_session
+from db.db_weeks import current_week, shift_week, format_week_label
+from db.db_models import Epic, Task
+
+# Consultas que se ejecutan en cada rerun del tablero: (SQL original sobre el esquema base,
+# SQL que ejecuta db_manager hoy sobre el esquema migrado, parámetros). Una tupla de SQL
+# son varias sentencias que la función ejecuta en cada llamada.
+HOT_QUERIES = {
+    "get_epics_by_week": (
+        "SELECT * FROM epics WHERE week = ?",
+        f"SELECT {Epic.columns()} FROM epics WHERE week = ?",
+        ("Semana 25 - 2025",)),
+    "get_tasks_by_epic": (
+        "SELECT * FROM tasks WHERE epic_id = ? ORDER BY priority DESC, id ASC",
+        f"SELECT {Task.columns()} FROM tasks WHERE epic_id = ? ORDER BY priority_rank ASC, id ASC",
+        (2500,)),
+    # Antes dos COUNT sobre tasks; hoy lee los contadores que mantienen los triggers
+    "get_task_completion_status": (
+        ("SELECT COUNT(*) FROM tasks WHERE epic_id = ?",
+         "SELECT COUNT(*) FROM tasks WHERE epic_id = ? AND status = 'Completado'"),
+        "SELECT tasks_completed, tasks_total FROM epics WHERE id = ?",
+        (2500,)),
+}
+
+
+def build_database(path, n_tasks, tasks_per_epic=20, weeks=52):
+    """Crea una base de datos con el esquema base (sin migraciones) y n_tasks tareas"""
+    conn = sqlite3.connect(path)
+    create_tables(conn)
+    n_epics = max(1, n_tasks // tasks_per_epic)
+    statuses = ["Pendiente", "En progreso", "Hecho"]
+    priorities = ["Alta", "Media", "Baja"]
+    conn.executemany(
+        "INSERT INTO epics (id, name, description, week, status) VALUES (?, ?, ?, ?, ?)",
+        ((i, f"Épica {i}", "", f"Semana {i % weeks + 1} - 2025", statuses[i % 3])
+         for i in range(1, n_epics + 1)))
+    conn.executemany(
+        "INSERT INTO tasks (title, description, epic_id, owner, priority, status) VALUES (?, ?, ?, ?, ?, ?)",
+        ((f"Tarea {i}", "", i % n_epics + 1, f"Owner {i % 7}", priorities[i % 3],
+          "Completado" if i % 2 else "Pendiente")
+         for i in range(n_tasks)))
+    conn.commit()
+    return conn
+
+
+def _statements(sql):
+    return sql if isinstance(sql, tuple) else (sql,)
+
+
+def explain(conn, sql, params):
+    """Retorna el detalle de EXPLAIN QUERY PLAN de una consulta (o de cada sentencia de una tupla)"""
+    return [row[3] for statement in _statements(sql) for row in conn.execute(f"EXPLAIN QUERY PLAN {statement}", params)]
+
+
+def time_query(conn, sql, params, repeat=50):
+    """Tiempo medio en milisegundos de una consulta (una tupla cuenta todas sus sentencias)"""
+    statements = _statements(sql)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for statement in statements:
+            conn.execute(statement, params).fetchall()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def report(conn, label, migrated):
+    print(f"\n=== {label} (schema v{get_schema_version(conn)}) ===")
+    results = {}
+    for name, (original_sql, current_sql, params) in HOT_QUERIES.items():
+        sql = current_sql if migrated else original_sql
+        ms = time_query(conn, sql, params)
+        results[name] = ms
+        print(f"- {name}: {ms:.3f} ms")
+        for detail in explain(conn, sql, params):
+            print(f"    plan: {detail}")
+    return results
+
+
+def run_query_plan_benchmark(n_tasks):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build_database(os.path.join(tmp, "bench.db"), n_tasks)
+        before = report(conn, f"Sin índices, {n_tasks} tareas", migrated=False)
+        migrate(conn)
+        conn.execute("ANALYZE")
+        after = report(conn, f"Con migraciones, {n_tasks} tareas", migrated=True)
+        conn.close()
+
+    print("\n=== Mejora ===")
+    for name in HOT_QUERIES:
+        print(f"- {name}: {before[name] / after[name]:.1f}x")
+
+
+# ---- SUITE DE db_manager ----
+SUITE_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+SUITE_TASKS_PER_EPIC = 20
+SUITE_WEEKS = 52
+SUITE_REPEAT = 30
+SUITE_MAX_SECONDS = 5.0  # tiempo máximo por caso: las funciones lentas se miden menos veces
+SUITE_MIN_SAMPLES = 3
+REGRESSION_THRESHOLD = 1.25
+REGRESSION_MIN_MS = 0.25  # diferencias menores son ruido en consultas de microsegundos
+
+# Funciones públicas de db_manager que no son consultas o que no se pueden repetir sobre el dataset
+NOT_BENCHMARKED = {
+    'get_connection': "infraestructura",
+    'reading_from': "infraestructura",
+    'reading_snapshot': "infraestructura",
+    'cached_read': "infraestructura",
+    'invalidates_cache': "infraestructura",
+    'get_cache_stats': "infraestructura",
+    'restore_snapshot': "sobrescribe la base entera",
+    'archive_closed_weeks': "mueve las épicas al archivo y cambia el dataset de los demás casos",
+    'run_maintenance': "borra filas y reescribe el archivo (VACUUM); ver python -m db.db_maintenance",
+    'export_columnar': "escribe archivos en disco; ver python -m db.db_export",
+}
+
+
+class StreamlitStub:
+    """Sustituto de streamlit para el tablero: no dibuja nada y los widgets devuelven su valor por defecto"""
+
+    def __init__(self):
+        self.session_state = {}
+
+    def __getattr__(self, name):
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def columns(self, spec, **kwargs):
+        return [self] * (spec if isinstance(spec, int) else len(spec))
+
+    def checkbox(self, label, value=False, **kwargs):
+        return value
+
+    def selectbox(self, label, options, index=0, **kwargs):
+        return options[index]
+
+    def button(self, *args, **kwargs):
+        return False
+
+    form_submit_button = button
+
+    def text_input(self, *args, **kwargs):
+        return ""
+
+    def rerun(self):
+        raise RuntimeError("show_epic_board pidió st.rerun() sin interacción del usuario")
+
+
+def summarize(samples):
+    """Mínimo, media, percentiles y máximo (ms) de una lista de tiempos"""
+    ordered = sorted(samples)
+    cuts = statistics.quantiles(ordered, n=100, method='inclusive')
+    return {
+        'samples': len(ordered),
+        'min': round(ordered[0], 4),
+        'mean': round(statistics.fmean(ordered), 4),
+        'p50': round(cuts[49], 4),
+        'p90': round(cuts[89], 4),
+        'p95': round(cuts[94], 4),
+        'p99': round(cuts[98], 4),
+        'max': round(ordered[-1], 4),
+    }
+
+
+def time_case(func, setup=None, repeat=SUITE_REPEAT, max_seconds=SUITE_MAX_SECONDS):
+    """
+    Mide func hasta `repeat` veces (al menos SUITE_MIN_SAMPLES y como mucho `max_seconds`)
+
+    Args:
+        func: Función a medir; recibe como argumentos lo que retorne setup
+        setup: Se ejecuta antes de cada medición sin contar en el tiempo (vaciar la caché,
+               crear la fila que func va a borrar, ...); puede retornar una tupla de argumentos
+        repeat: Mediciones como máximo
+        max_seconds: Presupuesto de tiempo del caso
+
+    Retorna el resumen en ms y las sentencias SQL de la primera ejecución.
+    """
+    samples = []
+    statements = None
+    deadline = time.perf_counter() + max_seconds
+    while len(samples) < repeat and (len(samples) < SUITE_MIN_SAMPLES or time.perf_counter() < deadline):
+        args = (setup() or ()) if setup else ()
+        if statements is None:
+            # Primera ejecución instrumentada: cuenta sentencias (no entra en los tiempos)
+            with db_session("benchmark", force=True) as measured:
+                func(*args)
+            statements = measured.statements
+            args = (setup() or ()) if setup else ()
+        start = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {**summarize(samples), 'statements': statements}
+
+
+def suite_cases():
+    """
+    Casos de la suite: nombre -> (función, setup)
+
+    Las lecturas se miden en frío (caché de lecturas vacía antes de cada medición) y algunas
+    también en caliente. Las escrituras van al final porque agregan épicas y tareas a la semana
+    medida; las que modifican filas existentes alternan su estado.
+    """
+    from db import db_manager as m
+    from modules import epic_board
+
+    epic_board.st = StreamlitStub()
+    cache = get_cache(m.get_db_path())
+    last_week = shift_week(*current_week(), -1)
+    week = format_week_label(*last_week)
+    week_range = (shift_week(*last_week, -7), last_week)
+    with m.get_connection() as conn:
+        epic_id = conn.execute("SELECT id FROM epics WHERE week = ? ORDER BY id LIMIT 1", (week,)).fetchone()[0]
+        task_id = conn.execute("SELECT id FROM tasks WHERE epic_id = ? ORDER BY id LIMIT 1", (epic_id,)).fetchone()[0]
+        middle_id = conn.execute("SELECT MAX(id) / 2 FROM epics").fetchone()[0]
+    task_statuses = itertools.cycle(["Completado", "Pendiente"])
+    epic_statuses = itertools.cycle(["Hecho", "En progreso"])
+    new_tasks = [{"title": f"Tarea {i}"} for i in range(SUITE_TASKS_PER_EPIC)]
+
+    def cold():
+        cache.invalidate()
+
+    def with_epic():
+        return (m.create_epic("Benchmark", "", week),)
+
+    def with_task():
+        return (m.create_task("Benchmark", "", epic_id),)
+
+    return {
+        'get_epics_by_week': (lambda: m.get_epics_by_week(week), cold),
+        'get_epics_by_week_range': (lambda: m.get_epics_by_week_range(*week_range), cold),
+        'get_week_options': (m.get_week_options, cold),
+        'get_all_epics': (m.get_all_epics, cold),
+        'get_epics_page': (lambda: m.get_epics_page(after_id=middle_id), cold),
+        'get_epics_by_week_page': (lambda: m.get_epics_by_week_page(week), cold),
+        'get_epic_count_by_week': (m.get_epic_count_by_week, cold),
+        'get_tasks_by_epic': (lambda: m.get_tasks_by_epic(epic_id), cold),
+        'get_task_completion_status': (lambda: m.get_task_completion_status(epic_id), cold),
+        'check_task_counters': (m.check_task_counters, cold),
+        'get_board_data': (lambda: m.get_board_data(week), cold),
+        'search': (lambda: m.search("consultas caché"), cold),
+        'get_status_history': (lambda: m.get_status_history('task', task_id), cold),
+        'get_burndown': (lambda: m.get_burndown(week), cold),
+        'get_throughput': (lambda: m.get_throughput(*week_range), cold),
+        'get_cycle_times': (lambda: m.get_cycle_times(*week_range), cold),
+        'get_weekly_progress': (m.get_weekly_progress, cold),
+        'get_epic_metrics': (m.get_epic_metrics, cold),
+        'get_epic_metrics (semana)': (lambda: m.get_epic_metrics(week), cold),
+        'get_epic_metrics (rango)': (lambda: m.get_epic_metrics(week_range=week_range), cold),
+        'get_epic_metrics (caché caliente)': (m.get_epic_metrics, None),
+        # Camino de datos completo del tablero, con streamlit sustituido
+        'show_epic_board': (lambda: epic_board.show_epic_board(week), cold),
+        'show_epic_board (caché caliente)': (lambda: epic_board.show_epic_board(week), None),
+        # Escrituras
+        'create_epic': (lambda: m.create_epic("Benchmark", "", week), None),
+        'create_epic_with_tasks': (lambda: m.create_epic_with_tasks("Benchmark", "", week, tasks=new_tasks), None),
+        'delete_epic': (m.delete_epic, with_epic),
+        'create_task': (lambda: m.create_task("Benchmark", "", epic_id), None),
+        'delete_task': (m.delete_task, with_task),
+        'update_task_status': (lambda: m.update_task_status(task_id, next(task_statuses)), None),
+        'apply_task_status_changes': (lambda: m.apply_task_status_changes([(task_id, next(task_statuses))]), None),
+        'update_epic_status': (lambda: m.update_epic_status(epic_id, next(epic_statuses)), None),
+        'auto_complete_epic_if_tasks_done': (lambda: m.auto_complete_epic_if_tasks_done(epic_id), None),
+        'create_snapshot': (lambda: m.create_snapshot(retention=1), None),
+    }
+
+
+def uncovered_functions(cases):
+    """Funciones públicas de db_manager sin caso en la suite (para que ninguna quede fuera sin querer)"""
+    from db import db_manager
+
+    covered = {name.split(" ")[0] for name in cases}
+    public = [name for name, func in inspect.getmembers(db_manager, inspect.isfunction)
+              if func.__module__ == db_manager.__name__ and not name.startswith("_")]
+    return {name: NOT_BENCHMARKED.get(name, "sin caso en la suite") for name in public if name not in covered}
+
+
+def run_size(n_tasks, repeat, max_seconds):
+    """Construye un dataset de ~n_tasks tareas en una base temporal y mide todos los casos"""
+    from create_sample_data import generate_dataset
+
+    configure_backend('temp')
+    start = time.perf_counter()
+    created = generate_dataset(weeks=SUITE_WEEKS, epics_per_week=max(1, n_tasks // (SUITE_TASKS_PER_EPIC * SUITE_WEEKS)),
+                               tasks_per_epic=SUITE_TASKS_PER_EPIC, task_distribution='fixed')
+    build_s = time.perf_counter() - start
+    print(f"\n=== {created['tasks']} tareas, {created['epics']} épicas (construida en {build_s:.1f} s) ===")
+
+    cases = suite_cases()
+    results = {}
+    for name, (func, setup) in cases.items():
+        results[name] = time_case(func, setup, repeat, max_seconds)
+        stats = results[name]
+        print(f"{name:<42} p50 {stats['p50']:>9.3f} ms  p95 {stats['p95']:>9.3f} ms  "
+              f"{stats['statements']:>4} sentencias  ({stats['samples']} muestras)")
+
+    prune_snapshots(get_db_path(), keep=0)
+    return {
+        'tasks': created['tasks'],
+        'epics': created['epics'],
+        'db_bytes': os.path.getsize(get_db_path()),
+        'build_s': round(build_s, 3),
+        'results': results,
+    }, uncovered_functions(cases)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes, repeat=SUITE_REPEAT, max_seconds=SUITE_MAX_SECONDS):
+    """Ejecuta la suite para cada tamaño y retorna el resultado listo para guardar en JSON"""
+    suite = {
+        'meta': {
+            'commit': git_commit(),
+            'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'max_seconds': max_seconds,
+        },
+        'sizes': {},
+    }
+    try:
+        for n_tasks in sizes:
+            suite['sizes'][str(n_tasks)], suite['not_benchmarked'] = run_size(n_tasks, repeat, max_seconds)
+    finally:
+        # Vuelve al backend configurado y borra la última base temporal
+        configure_backend()
+    return suite
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compara el p50 de cada caso con una ejecución anterior
+
+    Retorna (tamaño, caso, p50 anterior, p50 actual) de los casos que empeoraron más de `threshold`
+    veces y al menos REGRESSION_MIN_MS.
+    """
+    regressions = []
+    for size, measured in current['sizes'].items():
+        previous = baseline['sizes'].get(size)
+        if previous is None:
+            continue
+        for name, stats in measured['results'].items():
+            before = previous['results'].get(name)
+            if (before and stats['p50'] > before['p50'] * threshold
+                    and stats['p50'] - before['p50'] >= REGRESSION_MIN_MS):
+                regressions.append((size, name, before['p50'], stats['p50']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de consultas del roadmap")
+    parser.add_argument("--tasks", type=int, default=100_000, help="Número de tareas a generar")
+    parser.add_argument("--suite", action="store_true",
+                        help="Mide cada función de db_manager y el tablero y guarda los resultados en JSON")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in SUITE_SIZES),
+                        help="Tamaños de la suite en tareas, separados por comas")
+    parser.add_argument("--repeat", type=int, default=SUITE_REPEAT, help="Mediciones máximas por caso")
+    parser.add_argument("--max-seconds", type=float, default=SUITE_MAX_SECONDS, help="Presupuesto de tiempo por caso")
+    parser.add_argument("--output", help="Archivo JSON de resultados (por defecto benchmarks/<commit>_<fecha>.json)")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior contra el que buscar regresiones")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Cuántas veces más lento (p50) cuenta como regresión")
+    args = parser.parse_args()
+
+    if not args.suite:
+        run_query_plan_benchmark(args.tasks)
+        return
+
+    suite = run_suite([int(size) for size in args.sizes.split(",")], args.repeat, args.max_seconds)
+    if suite.get('not_benchmarked'):
+        print("\nSin medir: " + ", ".join(f"{name} ({reason})" for name, reason in suite['not_benchmarked'].items()))
+
+    output = args.output or os.path.join(
+        "benchmarks", f"{(suite['meta']['commit'] or 'local')[:8]}_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(suite, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Resultados guardados en {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(suite, json.load(f), args.threshold)
+        for size, name, before, after in regressions:
+            print(f"⚠️ Regresión en {name} ({size} tareas): p50 {before:.3f} ms -> {after:.3f} ms ({after / before:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ Sin regresiones de más de {args.threshold}x respecto a {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
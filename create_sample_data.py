@@ -1,10 +1,22 @@
 #!/usr/bin/env python3
 """
 Script para crear datos de prueba para el sistema de roadmap
+Sin argumentos crea 3 épicas de ejemplo; con --synthetic genera un dataset grande y
+reproducible (semilla) para pruebas de rendimiento
 """
 
+import argparse
+import math
+import random
+import time
+
 from db.db_setup import init_db
-from db.db_manager import create_epic, create_task
+from db.db_archive import ARCHIVE_SCHEMA, ensure_archive_attached
+from db.db_backend import configure_backend, get_db_path
+from db.db_cache import get_cache
+from db.db_manager import create_epic_with_tasks, get_connection, PRIORITY_RANKS
+from db.db_weeks import current_week, shift_week, format_week_label
+from db import db_writer
 
 def create_sample_data():
     print("🚀 Creando datos de prueba...")
@@ -54,34 +66,282 @@ def create_sample_data():
     ]
     
     for epic_data in epic_examples:
-        # Crear épica
-        create_epic(
+        # Crear épica con sus tareas en una sola transacción
+        create_epic_with_tasks(
             epic_data["name"],
             epic_data["description"],
             epic_data["week"],
-            epic_data["status"]
+            epic_data["status"],
+            epic_data["tasks"]
         )
         
-        # Obtener ID de la épica recién creada (asumiendo que es la última)
-        from db.db_manager import get_all_epics
-        all_epics = get_all_epics()
-        epic_id = all_epics[0][0] if all_epics else None
-        
-        # Crear tareas para esta épica
-        if epic_id:
-            for task_data in epic_data["tasks"]:
-                create_task(
-                    task_data["title"],
-                    "",  # descripción vacía
-                    epic_id,
-                    task_data["owner"],
-                    task_data["priority"]
-                )
-        
         print(f"✅ Épica creada: {epic_data['name']} con {len(epic_data['tasks'])} tareas")
     
     print("🎉 ¡Datos de prueba creados exitosamente!")
     print("Ejecuta 'streamlit run app.py' para ver el resultado")
 
+# ---- DATASET SINTÉTICO ----
+EPIC_VERBS = ["Implementar", "Rediseñar", "Optimizar", "Migrar", "Automatizar", "Integrar", "Documentar", "Auditar"]
+EPIC_AREAS = ["autenticación", "pagos", "dashboard de métricas", "notificaciones", "búsqueda", "onboarding",
+              "reportes PDF", "API pública", "app móvil", "facturación", "permisos", "exportación de datos"]
+TASK_ACTIONS = ["Diseñar", "Implementar", "Probar", "Revisar", "Desplegar", "Medir", "Corregir", "Refactorizar"]
+TASK_OBJECTS = ["esquema de base de datos", "endpoints", "formularios", "validaciones", "caché", "consultas",
+                "tests end-to-end", "mockups", "logs", "alertas", "migración", "documentación"]
+OWNER_ROLES = ["Backend Dev", "Frontend Dev", "QA", "Tech Lead", "Product Manager", "UX Designer",
+               "Data Engineer", "DevOps"]
+
+DEFAULT_PRIORITY_MIX = "Alta=20,Media=50,Baja=30"
+DEFAULT_STATUS_MIX = "Pendiente=30,En progreso=30,Hecho=40"
+BULK_CACHE_KIB = 512 * 1024  # caché de páginas durante la carga masiva
+
+def parse_mix(text):
+    """Convierte 'Alta=20,Media=50' en (valores, pesos)"""
+    values, weights = [], []
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        value, _, weight = item.partition("=")
+        values.append(value.strip())
+        weights.append(float(weight))
+    return values, weights
+
+def task_count_sampler(rng, mean, distribution):
+    """
+    Función que sortea cuántas tareas tiene una épica, con media exactamente `mean`
+
+    Con media >= 1 toda épica tiene al menos una tarea; con media entre 0 y 1 hay épicas
+    vacías. 'fixed' y 'uniform' necesitan una media entera; 'geometric' admite decimales.
+    """
+    if distribution not in ("fixed", "uniform", "geometric"):
+        raise ValueError(f"Distribución de tareas desconocida: {distribution!r}")
+    if not 0 <= mean < float("inf"):
+        raise ValueError(f"La media de tareas por épica debe ser >= 0, no {mean!r}")
+    if distribution != "geometric" and mean != int(mean):
+        raise ValueError(f"La distribución {distribution!r} necesita una media entera, no {mean!r}")
+    if distribution == "fixed" or mean == 0:
+        return lambda: int(mean)
+    if distribution == "uniform":
+        # Entre 1 y 2·media - 1: simétrica alrededor de la media
+        return lambda: rng.randint(1, 2 * int(mean) - 1)
+    # geometric: muchas épicas pequeñas y pocas muy grandes. floor(Exp(λ)) es geométrica en
+    # {0, 1, ...} con razón q = e^-λ y media q / (1 - q); se desplaza a {1, 2, ...} si media >= 1
+    shift = 1 if mean >= 1 else 0
+    excess = mean - shift
+    if excess == 0:
+        return lambda: shift
+    rate = math.log((1 + excess) / excess)
+    return lambda: int(rng.expovariate(rate)) + shift
+
+# Historial de estados coherente con el estado final de cada fila, con fechas dentro de su semana.
+# synthetic_mondays guarda el lunes (julianday) de cada épica nueva: el 4 de enero siempre cae en
+# la semana ISO 1. Las horas (9-18 h) se derivan del id para que el dataset sea reproducible.
+SYNTHETIC_EVENTS_SQL = [
+    """
+    CREATE TEMP TABLE synthetic_mondays AS
+    SELECT id, julianday(date(iso_year || '-01-04',
+                              '-' || ((CAST(strftime('%w', iso_year || '-01-04') AS INTEGER) + 6) % 7) || ' days',
+                              '+' || ((iso_week - 1) * 7) || ' days')) AS jd
+    FROM epics WHERE id >= :first_epic
+    """,
+    """
+    INSERT INTO status_events (entity, entity_id, epic_id, from_status, to_status, changed_at)
+    SELECT 'epic', e.id, e.id, t.from_status, t.to_status,
+           strftime('%Y-%m-%d %H:%M:%f', m.jd + t.day + (32400 + (e.id * 2654435761) % 32400) / 86400.0)
+    FROM epics e
+    JOIN synthetic_mondays m ON m.id = e.id
+    JOIN (SELECT NULL AS from_status, 'Pendiente' AS to_status, 0 AS day, 0 AS min_stage
+          UNION ALL SELECT 'Pendiente', 'En progreso', 1, 1
+          UNION ALL SELECT 'En progreso', 'Hecho', 6, 2) t
+      ON t.min_stage <= CASE e.status WHEN 'Hecho' THEN 2 WHEN 'En progreso' THEN 1 ELSE 0 END
+    ORDER BY e.id, t.day
+    """,
+    """
+    INSERT INTO status_events (entity, entity_id, epic_id, from_status, to_status, changed_at)
+    SELECT 'task', t.id, t.epic_id, NULL, 'Pendiente',
+           strftime('%Y-%m-%d %H:%M:%f', m.jd + (32400 + (t.id * 2654435761) % 32400) / 86400.0)
+    FROM tasks t JOIN synthetic_mondays m ON m.id = t.epic_id
+    """,
+    """
+    INSERT INTO status_events (entity, entity_id, epic_id, from_status, to_status, changed_at)
+    SELECT 'task', t.id, t.epic_id, 'Pendiente', 'Completado',
+           strftime('%Y-%m-%d %H:%M:%f', m.jd + 1 + t.id % 6 + (32400 + (t.id * 2654435761) % 32400) / 86400.0)
+    FROM tasks t JOIN synthetic_mondays m ON m.id = t.epic_id
+    WHERE t.status = 'Completado'
+    """,
+    "DROP TABLE synthetic_mondays",
+]
+
+def _next_id(conn, table, archived):
+    """
+    Primer id libre de una tabla para la carga en bloque
+
+    Tiene en cuenta sqlite_sequence (ids de filas ya borradas) y el archivo histórico: un id
+    reutilizado haría que la fila nueva tapara a la archivada en las lecturas unidas.
+    """
+    sources = [f"SELECT MAX(id) FROM main.{table}", f"SELECT MAX(seq) FROM main.sqlite_sequence WHERE name = '{table}'"]
+    if archived:
+        sources.append(f"SELECT MAX(id) FROM {ARCHIVE_SCHEMA}.{table}")
+    return max(conn.execute(sql).fetchone()[0] or 0 for sql in sources) + 1
+
+def generate_dataset(weeks=52, epics_per_week=20, tasks_per_epic=10, task_distribution="geometric",
+                     owners=16, priority_mix=DEFAULT_PRIORITY_MIX, status_mix=DEFAULT_STATUS_MIX,
+                     seed=42, end_week=None, batch_size=50_000, keep_triggers=False):
+    """
+    Genera un dataset sintético reproducible y lo carga en bloque
+
+    Por defecto desactiva los triggers durante la carga y luego rellena en SQL lo que
+    mantendrían (contadores de epics, índices FTS y status_events con fechas dentro de
+    cada semana); todo en una sola transacción. Con keep_triggers=True inserta con los
+    triggers activos (más lento; el historial solo tiene el evento de creación).
+
+    Args:
+        weeks: Número de semanas ISO, terminando en end_week (por defecto la actual)
+        epics_per_week: Épicas por semana
+        tasks_per_epic: Media de tareas por épica
+        task_distribution: 'fixed', 'uniform' o 'geometric'
+        owners: Número de responsables distintos
+        priority_mix: Pesos de prioridad, ej. 'Alta=20,Media=50,Baja=30'
+        status_mix: Pesos de estado de las épicas, ej. 'Pendiente=30,En progreso=30,Hecho=40'
+        seed: Semilla del generador (mismo valor = mismo dataset)
+        batch_size: Filas por executemany
+
+    Retorna un dict con las épicas, tareas y eventos insertados.
+    """
+    rng = random.Random(seed)
+    priorities, priority_weights = parse_mix(priority_mix)
+    statuses, status_weights = parse_mix(status_mix)
+    priority_rows = [(label, PRIORITY_RANKS[label]) for label in priorities]
+    owner_names = [f"{OWNER_ROLES[i % len(OWNER_ROLES)]} {i // len(OWNER_ROLES) + 1}" for i in range(owners)]
+    titles = [f"{action} {target}" for action in TASK_ACTIONS for target in TASK_OBJECTS]
+    sample_tasks = task_count_sampler(rng, tasks_per_epic, task_distribution)
+    last = end_week or current_week()
+    week_list = [shift_week(*last, delta) for delta in range(-(weeks - 1), 1)]
+
+    init_db()
+    # Con el escritor único en pausa: ninguna escritura de la app se confirma a medias de la carga
+    with db_writer.exclusive(get_db_path()), get_connection() as conn:
+        archived = ensure_archive_attached(conn, get_db_path())
+        # Caché de páginas grande durante la carga: los índices no caben en la de por defecto
+        cache_size = conn.execute("PRAGMA cache_size").fetchone()[0]
+        conn.execute(f"PRAGMA cache_size = {-BULK_CACHE_KIB}")
+        conn.execute("BEGIN IMMEDIATE")
+        next_epic_id = _next_id(conn, 'epics', archived)
+        next_task_id = _next_id(conn, 'tasks', archived)
+        first_epic_id = next_epic_id
+        first_task_id = next_task_id
+        events_before = conn.execute("SELECT COUNT(*) FROM status_events").fetchone()[0]
+
+        triggers = []
+        if not keep_triggers:
+            triggers = conn.execute("""
+                SELECT name, sql FROM sqlite_master
+                WHERE type = 'trigger' AND tbl_name IN ('epics', 'tasks')
+            """).fetchall()
+            for name, _ in triggers:
+                conn.execute(f"DROP TRIGGER {name}")
+
+        epics, tasks = [], []
+        counts = {'epics': 0, 'tasks': 0}
+
+        def flush(force=False):
+            # Las épicas van primero: las tareas las referencian
+            for sql, rows, key in (
+                ("INSERT INTO epics (id, name, description, week, status, tasks_total, tasks_completed, "
+                 "iso_year, iso_week) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", epics, 'epics'),
+                ("INSERT INTO tasks (id, title, description, epic_id, owner, priority, priority_rank, status) "
+                 "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", tasks, 'tasks'),
+            ):
+                if rows and (force or len(tasks) >= batch_size):
+                    conn.executemany(sql, rows)
+                    counts[key] += len(rows)
+                    rows.clear()
+
+        for iso_year, iso_week in week_list:
+            label = format_week_label(iso_year, iso_week)
+            for epic_status in rng.choices(statuses, status_weights, k=epics_per_week):
+                epic_id = next_epic_id
+                next_epic_id += 1
+                n_tasks = sample_tasks()
+                if epic_status == "Hecho":
+                    done_flags = [True] * n_tasks
+                elif epic_status == "En progreso":
+                    done_flags = [rng.random() < 0.5 for _ in range(n_tasks)]
+                else:
+                    done_flags = [False] * n_tasks
+                tasks.extend(
+                    (task_id, title, "", epic_id, owner, priority, rank, "Completado" if done else "Pendiente")
+                    for task_id, title, owner, (priority, rank), done in zip(
+                        range(next_task_id, next_task_id + n_tasks),
+                        rng.choices(titles, k=n_tasks),
+                        rng.choices(owner_names, k=n_tasks),
+                        rng.choices(priority_rows, priority_weights, k=n_tasks),
+                        done_flags))
+                next_task_id += n_tasks
+                epics.append((epic_id, f"{rng.choice(EPIC_VERBS)} {rng.choice(EPIC_AREAS)}",
+                              f"Épica sintética de {label}", label, epic_status, n_tasks, sum(done_flags),
+                              iso_year, iso_week))
+                flush()
+        flush(force=True)
+
+        if triggers:
+            for sql in SYNTHETIC_EVENTS_SQL:
+                conn.execute(sql, {'first_epic': first_epic_id})
+            # Los índices FTS son de contenido externo: reconstruirlos desde epics/tasks
+            conn.execute("INSERT INTO epics_fts (epics_fts) VALUES ('rebuild')")
+            conn.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+            # Secuencia de cambios de la exportación incremental: la carga entera toma un valor
+            conn.execute("UPDATE change_sequence SET value = value + 1")
+            conn.execute("UPDATE epics SET change_seq = (SELECT value FROM change_sequence) WHERE id >= ?",
+                         (first_epic_id,))
+            conn.execute("UPDATE tasks SET change_seq = (SELECT value FROM change_sequence) WHERE id >= ?",
+                         (first_task_id,))
+            for _, sql in triggers:
+                conn.execute(sql)
+        counts['events'] = conn.execute("SELECT COUNT(*) FROM status_events").fetchone()[0] - events_before
+        # Estadísticas para el planificador (muestreadas: ANALYZE completo tarda en tablas grandes)
+        conn.execute("PRAGMA analysis_limit = 1000")
+        conn.execute("ANALYZE")
+        conn.commit()
+        conn.execute(f"PRAGMA cache_size = {cache_size}")
+
+    get_cache(get_db_path()).invalidate()
+    counts['first_epic_id'] = first_epic_id
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Crea datos de prueba para el roadmap")
+    parser.add_argument("--synthetic", action="store_true", help="Genera un dataset sintético grande")
+    parser.add_argument("--db", help="Archivo SQLite destino (por defecto ROADMAP_DB_PATH o roadmap.db)")
+    parser.add_argument("--weeks", type=int, default=52, help="Semanas a generar (terminando en la actual)")
+    parser.add_argument("--epics-per-week", type=int, default=20)
+    parser.add_argument("--tasks-per-epic", type=float, default=10, help="Media de tareas por épica (>= 0)")
+    parser.add_argument("--task-distribution", choices=["fixed", "uniform", "geometric"], default="geometric")
+    parser.add_argument("--owners", type=int, default=16)
+    parser.add_argument("--priorities", default=DEFAULT_PRIORITY_MIX, help="Pesos, ej. 'Alta=20,Media=50,Baja=30'")
+    parser.add_argument("--status-mix", default=DEFAULT_STATUS_MIX, help="Pesos de estado de las épicas")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=50_000, help="Filas por executemany")
+    parser.add_argument("--keep-triggers", action="store_true", help="Insertar con los triggers activos (más lento)")
+    args = parser.parse_args()
+
+    try:
+        task_count_sampler(random.Random(), args.tasks_per_epic, args.task_distribution)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    if args.db:
+        configure_backend("file", args.db)
+    if not args.synthetic:
+        create_sample_data()
+        return
+
+    print(f"🚀 Generando dataset sintético en {get_db_path()} (semilla {args.seed})...")
+    start = time.perf_counter()
+    counts = generate_dataset(
+        weeks=args.weeks, epics_per_week=args.epics_per_week, tasks_per_epic=args.tasks_per_epic,
+        task_distribution=args.task_distribution, owners=args.owners, priority_mix=args.priorities,
+        status_mix=args.status_mix, seed=args.seed, batch_size=args.batch_size,
+        keep_triggers=args.keep_triggers)
+    print(f"✅ {counts['epics']} épicas, {counts['tasks']} tareas y {counts['events']} eventos "
+          f"en {time.perf_counter() - start:.1f}s")
+
 if __name__ == "__main__":
-    create_sample_data()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,284 @@
+"""
+Archivo de semanas cerradas (particionado caliente/frío)
+Mueve las épicas 'Hecho' de semanas pasadas, con sus tareas, a una base SQLite aparte
+que las lecturas históricas adjuntan con ATTACH y unen con UNION ALL
+"""
+
+import os
+import argparse
+
+from db.db_weeks import current_week, parse_week_label
+
+ARCHIVE_SCHEMA = "archive"
+
+# Columnas copiadas al archivo (mismo orden en ambas bases). change_seq viaja con la fila: la
+# exportación incremental (db_export) sigue viéndola como ya exportada tras el movimiento
+EPIC_COLUMNS = "id, name, description, week, status, tasks_total, tasks_completed, iso_year, iso_week, change_seq"
+TASK_COLUMNS = "id, title, description, epic_id, owner, priority, priority_rank, status, change_seq"
+
+ARCHIVE_DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.epics (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        description TEXT,
+        week TEXT,
+        status TEXT,
+        tasks_total INTEGER NOT NULL DEFAULT 0,
+        tasks_completed INTEGER NOT NULL DEFAULT 0,
+        iso_year INTEGER,
+        iso_week INTEGER,
+        change_seq INTEGER NOT NULL DEFAULT 0,
+        archived_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.tasks (
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        description TEXT,
+        epic_id INTEGER,
+        owner TEXT,
+        priority TEXT,
+        priority_rank INTEGER NOT NULL DEFAULT 2,
+        status TEXT,
+        change_seq INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_archive_epics_iso_week ON epics (iso_year, iso_week)",
+    f"CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_archive_epics_week ON epics (week)",
+    f"CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_archive_tasks_epic_priority ON tasks (epic_id, priority_rank, id)",
+    f"CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_archive_epics_change_seq ON epics (change_seq)",
+    f"CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_archive_tasks_change_seq ON tasks (change_seq)",
+    # Índices de búsqueda propios del archivo; los triggers viven en el archivo y sus tablas
+    # sin prefijo son las del archivo
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.epics_fts USING fts5(
+        name, description,
+        content='epics', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.tasks_fts USING fts5(
+        title, description, owner,
+        content='tasks', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {ARCHIVE_SCHEMA}.trg_archive_epics_fts_insert AFTER INSERT ON epics
+    BEGIN
+        INSERT INTO epics_fts (rowid, name, description) VALUES (NEW.id, NEW.name, NEW.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {ARCHIVE_SCHEMA}.trg_archive_epics_fts_delete AFTER DELETE ON epics
+    BEGIN
+        INSERT INTO epics_fts (epics_fts, rowid, name, description)
+        VALUES ('delete', OLD.id, OLD.name, OLD.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {ARCHIVE_SCHEMA}.trg_archive_tasks_fts_insert AFTER INSERT ON tasks
+    BEGIN
+        INSERT INTO tasks_fts (rowid, title, description, owner)
+        VALUES (NEW.id, NEW.title, NEW.description, NEW.owner);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {ARCHIVE_SCHEMA}.trg_archive_tasks_fts_delete AFTER DELETE ON tasks
+    BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, title, description, owner)
+        VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.owner);
+    END
+    """,
+]
+
+# Condición de archivo sobre main.epics (alias e): 'Hecho' y de una semana anterior a la de corte
+ARCHIVE_WHERE = "e.status = 'Hecho' AND (e.iso_year, e.iso_week) < (?, ?)"
+
+
+def _same_row(columns, left, right):
+    """Condición SQL: todas las columnas de `left` y `right` son iguales (NULL incluido)"""
+    return " AND ".join(f"{left}.{column} IS {right}.{column}" for column in columns.split(", "))
+
+
+def union_source(table, columns):
+    """
+    Subconsulta con las filas de `table` en la base caliente y en el archivo adjunto
+
+    Una fila que está en ambas (entre la copia y el borrado de archive_closed_weeks) se
+    lee de la base caliente.
+    """
+    return f"""(SELECT {columns} FROM main.{table} UNION ALL
+                SELECT {columns} FROM {ARCHIVE_SCHEMA}.{table} a
+                WHERE NOT EXISTS (SELECT 1 FROM main.{table} m WHERE m.id = a.id))"""
+
+
+def _add_change_seq(conn):
+    """Archivos creados antes de guardar change_seq: añadir la columna (las filas quedan en 0)"""
+    for table in ('epics', 'tasks'):
+        columns = {row[1] for row in conn.execute(f"PRAGMA {ARCHIVE_SCHEMA}.table_info({table})")}
+        if 'change_seq' not in columns:
+            conn.execute(f"ALTER TABLE {ARCHIVE_SCHEMA}.{table} ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0")
+
+
+def get_archive_path(db_path):
+    """Ruta del archivo frío asociado a una base de datos (roadmap.db -> roadmap_archive.db)"""
+    if db_path.startswith("file:") and "?" in db_path:
+        # URI (backend en memoria): mismo tipo de base con otro nombre
+        name, query = db_path.split("?", 1)
+        return f"{name}_archive?{query}"
+    root, ext = os.path.splitext(db_path)
+    return f"{root}_archive{ext or '.db'}"
+
+
+def ensure_archive_attached(conn, db_path, create=False):
+    """
+    Adjunta el archivo frío a la conexión como esquema 'archive' si aún no lo está
+
+    Retorna False si el archivo no existe y create=False (no hay histórico que leer).
+    """
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+    if ARCHIVE_SCHEMA in attached:
+        return True
+    archive_path = get_archive_path(db_path)
+    if not create and not os.path.exists(archive_path):
+        return False
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (archive_path,))
+    has_fts = conn.execute(f"SELECT 1 FROM {ARCHIVE_SCHEMA}.sqlite_master WHERE name = 'epics_fts'").fetchone()
+    conn.execute(ARCHIVE_DDL[0])
+    conn.execute(ARCHIVE_DDL[1])
+    _add_change_seq(conn)
+    for statement in ARCHIVE_DDL[2:]:
+        conn.execute(statement)
+    if not has_fts:
+        # Archivo creado antes de los índices de búsqueda: indexar lo que ya tiene
+        conn.execute(f"INSERT INTO {ARCHIVE_SCHEMA}.epics_fts (epics_fts) VALUES ('rebuild')")
+        conn.execute(f"INSERT INTO {ARCHIVE_SCHEMA}.tasks_fts (tasks_fts) VALUES ('rebuild')")
+    conn.commit()
+    return True
+
+
+def archive_closed_weeks(conn, db_path, before=None, batch_size=200, max_batches=None):
+    """
+    Mueve al archivo las épicas en estado 'Hecho' de semanas anteriores a `before`
+
+    Cada lote se copia al archivo en una transacción y se borra de la base caliente
+    en otra. El borrado vuelve a comprobar la condición y que la épica y sus tareas
+    sigan idénticas a su copia: si algo cambió entre medias, la épica se queda en la
+    base caliente y se descarta su copia. Si el proceso se interrumpe, volver a
+    ejecutarlo retoma desde donde quedó sin duplicar ni perder filas.
+
+    Args:
+        conn: Conexión a la base caliente
+        db_path: Ruta de la base caliente (para ubicar el archivo)
+        before: Semana ISO (año, semana) o etiqueta; por defecto la semana actual
+        batch_size: Épicas por lote
+        max_batches: Límite de lotes por ejecución (None = hasta terminar)
+
+    Retorna un dict con las épicas y tareas movidas, las que se quedaron porque
+    cambiaron durante el lote y los lotes ejecutados.
+    """
+    if before is None:
+        before = current_week()
+    elif isinstance(before, str):
+        label, before = before, parse_week_label(before)
+        if before[0] is None:
+            raise ValueError(f"Semana de corte no válida: {label!r} (se espera 'Semana NN - AAAA')")
+
+    ensure_archive_attached(conn, db_path, create=True)
+    moved = {'epics': 0, 'tasks': 0, 'changed': 0, 'batches': 0}
+    last_id = 0
+
+    while max_batches is None or moved['batches'] < max_batches:
+        # Avanza por id: las épicas que cambiaron durante un lote no se vuelven a intentar
+        ids = [row[0] for row in conn.execute(f"""
+            SELECT e.id FROM main.epics e
+            WHERE {ARCHIVE_WHERE} AND e.id > ?
+            ORDER BY e.id
+            LIMIT ?
+        """, (*before, last_id, batch_size))]
+        if not ids:
+            break
+        last_id = ids[-1]
+        placeholders = ", ".join("?" * len(ids))
+
+        # 1) Copiar al archivo (idempotente: un reintento borra la copia anterior y la rehace)
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(f"DELETE FROM {ARCHIVE_SCHEMA}.tasks WHERE epic_id IN ({placeholders})", ids)
+        conn.execute(f"DELETE FROM {ARCHIVE_SCHEMA}.epics WHERE id IN ({placeholders})", ids)
+        conn.execute(f"""
+            INSERT INTO {ARCHIVE_SCHEMA}.epics ({EPIC_COLUMNS})
+            SELECT {EPIC_COLUMNS} FROM main.epics WHERE id IN ({placeholders})
+        """, ids)
+        conn.execute(f"""
+            INSERT INTO {ARCHIVE_SCHEMA}.tasks ({TASK_COLUMNS})
+            SELECT {TASK_COLUMNS} FROM main.tasks WHERE epic_id IN ({placeholders})
+        """, ids)
+        conn.commit()
+
+        # 2) Borrar de la base caliente solo las épicas que siguen cumpliendo la condición
+        #    y coinciden con su copia, tareas incluidas (mismas filas y mismo número)
+        conn.execute("BEGIN IMMEDIATE")
+        unchanged = [row[0] for row in conn.execute(f"""
+            SELECT e.id FROM main.epics e
+            JOIN {ARCHIVE_SCHEMA}.epics a ON a.id = e.id
+            WHERE e.id IN ({placeholders}) AND {ARCHIVE_WHERE}
+              AND {_same_row(EPIC_COLUMNS, 'e', 'a')}
+              AND (SELECT COUNT(*) FROM main.tasks WHERE epic_id = e.id)
+                  = (SELECT COUNT(*) FROM {ARCHIVE_SCHEMA}.tasks WHERE epic_id = e.id)
+              AND NOT EXISTS (
+                  SELECT 1 FROM main.tasks t
+                  LEFT JOIN {ARCHIVE_SCHEMA}.tasks c ON c.id = t.id
+                  WHERE t.epic_id = e.id AND (c.id IS NULL OR NOT ({_same_row(TASK_COLUMNS, 't', 'c')}))
+              )
+        """, (*ids, *before))]
+        kept = set(unchanged)
+        changed = [epic_id for epic_id in ids if epic_id not in kept]
+        if changed:
+            # Siguen vivas en la base caliente: su copia quedó vieja
+            changed_placeholders = ", ".join("?" * len(changed))
+            conn.execute(f"DELETE FROM {ARCHIVE_SCHEMA}.tasks WHERE epic_id IN ({changed_placeholders})", changed)
+            conn.execute(f"DELETE FROM {ARCHIVE_SCHEMA}.epics WHERE id IN ({changed_placeholders})", changed)
+        tasks_deleted = epics_deleted = 0
+        if unchanged:
+            # Es un movimiento, no un borrado: la bandera archive_move (migración 10) evita el
+            # evento de cierre en status_events y la marca en deleted_rows
+            unchanged_placeholders = ", ".join("?" * len(unchanged))
+            conn.execute("INSERT INTO main.archive_move (id) VALUES (1)")
+            tasks_deleted = conn.execute(
+                f"DELETE FROM main.tasks WHERE epic_id IN ({unchanged_placeholders})", unchanged).rowcount
+            epics_deleted = conn.execute(
+                f"DELETE FROM main.epics WHERE id IN ({unchanged_placeholders})", unchanged).rowcount
+            conn.execute("DELETE FROM main.archive_move")
+        conn.commit()
+
+        moved['epics'] += epics_deleted
+        moved['tasks'] += tasks_deleted
+        moved['changed'] += len(changed)
+        moved['batches'] += 1
+
+    return moved
+
+
+def main():
+    from db.db_backend import get_db_path
+    from db.db_manager import archive_closed_weeks as archive
+
+    parser = argparse.ArgumentParser(description="Archiva las épicas terminadas de semanas pasadas")
+    parser.add_argument("--before", help="Semana límite, ej. 'Semana 30 - 2025' (por defecto la actual)")
+    parser.add_argument("--batch-size", type=int, default=200, help="Épicas por lote")
+    parser.add_argument("--max-batches", type=int, default=None, help="Lotes máximos en esta ejecución")
+    args = parser.parse_args()
+
+    moved = archive(before=args.before, batch_size=args.batch_size, max_batches=args.max_batches)
+    print(f"✅ Archivadas {moved['epics']} épicas y {moved['tasks']} tareas en {moved['batches']} lotes "
+          f"({get_db_path()} -> {get_archive_path(get_db_path())})")
+    if moved['changed']:
+        print(f"- {moved['changed']} épicas cambiaron durante el proceso y siguen en la base caliente")
+
+
+if __name__ == "__main__":
+    main()
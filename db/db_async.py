@@ -0,0 +1,133 @@
+"""
+Acceso asíncrono a la base de datos
+Fachada asyncio sobre db_manager: cada llamada corre en un pool de hilos acotado y cada hilo
+toma su propia conexión del pool de conexiones, así varias semanas, reportes o sesiones
+consultan a la vez en lugar de esperar una detrás de otra. Las funciones conservan los
+nombres y argumentos de db_manager.
+
+    metrics = await db_async.get_epic_metrics("Semana 40 - 2025")
+    by_week = await db_async.get_epic_metrics_by_week(["Semana 39 - 2025", "Semana 40 - 2025"])
+
+Desde código síncrono, submit() devuelve un Future para adelantar consultas mientras se
+hace otra cosa (ReportGenerator lo usa para leer las tareas mientras dibuja los gráficos).
+"""
+
+import os
+import asyncio
+import threading
+import contextvars
+from functools import wraps
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from db import db_manager
+from db.db_connection import DEFAULT_POOL_SIZE
+
+# Tantos hilos como conexiones tiene el pool: más hilos solo esperarían una conexión libre
+ASYNC_WORKERS = int(os.getenv('ROADMAP_DB_ASYNC_WORKERS', DEFAULT_POOL_SIZE))
+
+_executor = None
+_executor_lock = threading.Lock()
+_worker = threading.local()
+
+
+def _mark_worker():
+    _worker.active = True
+
+
+def get_executor():
+    """Devuelve el pool de hilos de la base de datos, creándolo si aún no existe"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS, thread_name_prefix="roadmap-db",
+                                               initializer=_mark_worker)
+    return _executor
+
+
+def shutdown_executor(wait=True):
+    """Detiene el pool de hilos (útil al terminar scripts o pruebas); se recrea en la próxima llamada"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+def submit(func, *args, **kwargs):
+    """
+    Ejecuta func en el pool de hilos y retorna un concurrent.futures.Future
+
+    La llamada hereda el contexto actual: lee del mismo snapshot (reading_from) y
+    suma sus consultas a la misma sesión de instrumentación que quien la lanza.
+    Dentro de un hilo del pool se ejecuta en el acto: esperar a otro hilo del mismo
+    pool podría bloquearlo entero.
+    """
+    if getattr(_worker, 'active', False):
+        future = Future()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+    context = contextvars.copy_context()
+    return get_executor().submit(context.run, func, *args, **kwargs)
+
+
+async def run(func, *args, **kwargs):
+    """Espera func ejecutada en el pool de hilos sin bloquear el event loop"""
+    return await asyncio.wrap_future(submit(func, *args, **kwargs))
+
+
+def _async(func):
+    """Versión async de una función de db_manager"""
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run(func, *args, **kwargs)
+    return wrapper
+
+
+# ---- LECTURAS ----
+get_epics_by_week = _async(db_manager.get_epics_by_week)
+get_epics_by_week_range = _async(db_manager.get_epics_by_week_range)
+get_week_options = _async(db_manager.get_week_options)
+get_all_epics = _async(db_manager.get_all_epics)
+get_epics_page = _async(db_manager.get_epics_page)
+get_epics_by_week_page = _async(db_manager.get_epics_by_week_page)
+get_epic_count_by_week = _async(db_manager.get_epic_count_by_week)
+get_tasks_by_epic = _async(db_manager.get_tasks_by_epic)
+get_task_completion_status = _async(db_manager.get_task_completion_status)
+get_board_data = _async(db_manager.get_board_data)
+search = _async(db_manager.search)
+get_status_history = _async(db_manager.get_status_history)
+get_burndown = _async(db_manager.get_burndown)
+get_throughput = _async(db_manager.get_throughput)
+get_cycle_times = _async(db_manager.get_cycle_times)
+get_weekly_progress = _async(db_manager.get_weekly_progress)
+get_epic_metrics = _async(db_manager.get_epic_metrics)
+
+# ---- ESCRITURAS ----
+create_epic = _async(db_manager.create_epic)
+create_epic_with_tasks = _async(db_manager.create_epic_with_tasks)
+update_epic_status = _async(db_manager.update_epic_status)
+delete_epic = _async(db_manager.delete_epic)
+create_task = _async(db_manager.create_task)
+update_task_status = _async(db_manager.update_task_status)
+delete_task = _async(db_manager.delete_task)
+apply_task_status_changes = _async(db_manager.apply_task_status_changes)
+auto_complete_epic_if_tasks_done = _async(db_manager.auto_complete_epic_if_tasks_done)
+create_snapshot = _async(db_manager.create_snapshot)
+
+
+# ---- VARIAS SEMANAS A LA VEZ ----
+async def get_epic_metrics_by_week(weeks, include_archive=True):
+    """Métricas de varias semanas consultadas en paralelo; retorna {semana: métricas}"""
+    results = await asyncio.gather(*(get_epic_metrics(week, include_archive=include_archive) for week in weeks))
+    return dict(zip(weeks, results))
+
+
+async def get_board_data_by_week(weeks):
+    """Datos del tablero de varias semanas consultados en paralelo; retorna {semana: tablero}"""
+    results = await asyncio.gather(*(get_board_data(week) for week in weeks))
+    return dict(zip(weeks, results))
+
@@ -0,0 +1,104 @@
+"""
+Backend de almacenamiento de la base de datos
+Decide dónde vive la base SQLite (archivo, memoria compartida o archivo temporal) para que
+db_manager y db_setup no dependan de una ruta fija. Se elige con ROADMAP_DB_BACKEND y
+ROADMAP_DB_PATH o desde código con configure_backend (pruebas y benchmarks).
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import uuid
+
+from db.db_connection import configure_pool, close_pool
+from db.db_cache import close_cache
+from db.db_writer import close_writer
+
+BACKEND_KINDS = ('file', 'memory', 'temp')
+DEFAULT_BACKEND = os.getenv('ROADMAP_DB_BACKEND', 'file')
+DEFAULT_DB_PATH = os.getenv('ROADMAP_DB_PATH', 'roadmap.db')
+
+
+class StorageBackend:
+    def __init__(self, kind=DEFAULT_BACKEND, path=None):
+        """
+        Prepara el almacenamiento de la base de datos
+
+        Args:
+            kind: 'file' (ruta en disco), 'memory' (:memory: compartida entre las conexiones
+                  del proceso) o 'temp' (archivo temporal que se borra al cerrar)
+            path: Ruta para 'file' (por defecto ROADMAP_DB_PATH) o nombre para 'memory'
+        """
+        if kind not in BACKEND_KINDS:
+            raise ValueError(f"Backend de almacenamiento desconocido: {kind}")
+        self.kind = kind
+        self._anchor = None
+
+        if kind == 'file':
+            self.db_path = path or DEFAULT_DB_PATH
+        elif kind == 'memory':
+            # Base en memoria con caché compartida: vive mientras quede una conexión abierta,
+            # así que guardamos una conexión "ancla" hasta close()
+            name = path or f"roadmap_{uuid.uuid4().hex}"
+            self.db_path = f"file:{name}?mode=memory&cache=shared"
+            self._anchor = sqlite3.connect(self.db_path, uri=True, check_same_thread=False)
+            # Con caché compartida los locks son por tabla y no respetan busy_timeout:
+            # una sola conexión en el pool serializa el acceso
+            configure_pool(self.db_path, size=1, profile='legacy', checkpoint_interval=0)
+        else:
+            fd, self.db_path = tempfile.mkstemp(prefix="roadmap_", suffix=".db")
+            os.close(fd)
+
+    def connect(self):
+        """Abre una conexión nueva a la base de datos del backend"""
+        return sqlite3.connect(self.db_path, uri=True)
+
+    def close(self):
+        """Cierra las conexiones del backend; 'memory' y 'temp' descartan sus datos"""
+        close_writer(self.db_path)
+        close_pool(self.db_path)
+        close_cache(self.db_path)
+        if self._anchor is not None:
+            self._anchor.close()
+            self._anchor = None
+        if self.kind == 'temp':
+            for suffix in ("", "-wal", "-shm", "-journal"):
+                if os.path.exists(self.db_path + suffix):
+                    os.remove(self.db_path + suffix)
+
+    def __repr__(self):
+        return f"StorageBackend({self.kind!r}, {self.db_path!r})"
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Devuelve el backend activo, creándolo desde la configuración si aún no existe"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = StorageBackend(DEFAULT_BACKEND)
+    return _backend
+
+
+def configure_backend(kind=DEFAULT_BACKEND, path=None):
+    """
+    Reemplaza el backend activo (cerrando el anterior) y lo retorna
+
+    Ejemplo en pruebas: configure_backend('memory'); init_db()
+    """
+    global _backend
+    with _backend_lock:
+        old, _backend = _backend, StorageBackend(kind, path)
+    if old is not None:
+        old.close()
+    return _backend
+
+
+def get_db_path():
+    """Ruta (o URI) de la base de datos del backend activo"""
+    return get_backend().db_path
@@ -0,0 +1,181 @@
+"""
+Copias de seguridad en caliente de la base de datos
+Usa la API de backup online de SQLite por tramos de páginas, así la copia es consistente
+aunque Streamlit siga escribiendo y los escritores solo esperan lo que dura cada tramo
+"""
+
+import os
+import sqlite3
+import argparse
+import datetime
+
+from db.db_connection import close_pool
+from db.db_cache import close_cache
+
+BACKUP_DIR = os.getenv('ROADMAP_BACKUP_DIR', 'backups')
+BACKUP_RETENTION = int(os.getenv('ROADMAP_BACKUP_RETENTION', 10))  # snapshots a conservar (0 = todos)
+BACKUP_PAGES = 256      # páginas copiadas por tramo
+BACKUP_SLEEP = 0.005    # segundos de pausa entre tramos para dejar pasar a los escritores
+
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S_%f"
+
+
+def _snapshot_prefix(db_path):
+    # Acepta rutas y URIs ("file:nombre?mode=memory&cache=shared")
+    name = db_path.split("?")[0]
+    name = name[len("file:"):] if name.startswith("file:") else name
+    return os.path.splitext(os.path.basename(name))[0] + "_"
+
+
+def _copy(source, dest, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP):
+    """Copia source en dest por tramos con la API de backup"""
+    source.backup(dest, pages=pages, sleep=sleep)
+
+
+def create_snapshot(db_path, backup_dir=BACKUP_DIR, retention=BACKUP_RETENTION,
+                    pages=BACKUP_PAGES, sleep=BACKUP_SLEEP):
+    """
+    Crea un snapshot consistente de la base de datos sin detener la aplicación
+
+    El snapshot se escribe en un archivo temporal y se renombra al terminar, así nunca
+    queda a la vista una copia a medias. Queda en modo journal DELETE (un único archivo,
+    sin -wal) y se valida con quick_check.
+
+    Args:
+        db_path: Base de datos a copiar
+        backup_dir: Directorio de los snapshots
+        retention: Snapshots a conservar tras la copia (0 = no borrar ninguno)
+        pages: Páginas por tramo de copia
+        sleep: Pausa entre tramos (segundos)
+
+    Retorna la ruta del snapshot creado.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime(TIMESTAMP_FORMAT)
+    path = os.path.join(backup_dir, f"{_snapshot_prefix(db_path)}{timestamp}.db")
+    tmp_path = path + ".tmp"
+
+    source = sqlite3.connect(db_path, uri=True)
+    dest = sqlite3.connect(tmp_path)
+    try:
+        source.execute("PRAGMA busy_timeout = 5000")
+        _copy(source, dest, pages, sleep)
+        dest.execute("PRAGMA journal_mode = DELETE")
+        result = dest.execute("PRAGMA quick_check").fetchone()[0]
+        if result != "ok":
+            raise sqlite3.DatabaseError(f"El snapshot no pasó quick_check: {result}")
+    except BaseException:
+        dest.close()
+        os.remove(tmp_path)
+        raise
+    finally:
+        source.close()
+    dest.close()
+    os.replace(tmp_path, path)
+
+    if retention:
+        prune_snapshots(db_path, backup_dir, keep=retention)
+    return path
+
+
+def list_snapshots(db_path, backup_dir=BACKUP_DIR):
+    """
+    Snapshots de una base de datos, del más reciente al más antiguo
+
+    Retorna tuplas (ruta, fecha de creación, tamaño en bytes).
+    """
+    if not os.path.isdir(backup_dir):
+        return []
+    prefix = _snapshot_prefix(db_path)
+    snapshots = []
+    for name in os.listdir(backup_dir):
+        if not (name.startswith(prefix) and name.endswith(".db")):
+            continue
+        try:
+            created = datetime.datetime.strptime(name[len(prefix):-3], TIMESTAMP_FORMAT)
+        except ValueError:
+            continue
+        path = os.path.join(backup_dir, name)
+        snapshots.append((path, created, os.path.getsize(path)))
+    snapshots.sort(key=lambda snapshot: snapshot[1], reverse=True)
+    return snapshots
+
+
+def prune_snapshots(db_path, backup_dir=BACKUP_DIR, keep=BACKUP_RETENTION):
+    """Borra los snapshots más antiguos dejando los `keep` más recientes; retorna las rutas borradas"""
+    removed = []
+    for path, _, _ in list_snapshots(db_path, backup_dir)[keep:]:
+        # Un reporte pudo haber leído este snapshot: soltar sus conexiones antes de borrarlo
+        close_pool(path)
+        close_cache(path)
+        os.remove(path)
+        removed.append(path)
+    return removed
+
+
+def latest_snapshot(db_path, backup_dir=BACKUP_DIR, max_age=None):
+    """Ruta del snapshot más reciente (con antigüedad máxima en segundos) o None"""
+    snapshots = list_snapshots(db_path, backup_dir)
+    if not snapshots:
+        return None
+    path, created, _ = snapshots[0]
+    if max_age is not None and (datetime.datetime.now() - created).total_seconds() > max_age:
+        return None
+    return path
+
+
+def restore_snapshot(snapshot_path, db_path, backup_dir=BACKUP_DIR, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP):
+    """
+    Restaura un snapshot sobre la base de datos en uso
+
+    Antes de sobrescribir guarda un snapshot del estado actual (sin aplicar retención),
+    así una restauración equivocada también se puede deshacer. La copia se hace con la
+    API de backup, por lo que las conexiones abiertas ven el contenido restaurado.
+
+    Retorna la ruta del snapshot de seguridad.
+    """
+    if not os.path.exists(snapshot_path):
+        raise FileNotFoundError(snapshot_path)
+    safety_path = create_snapshot(db_path, backup_dir, retention=0, pages=pages, sleep=sleep)
+
+    source = sqlite3.connect(f"file:{snapshot_path}?mode=ro", uri=True)
+    dest = sqlite3.connect(db_path, uri=True)
+    try:
+        dest.execute("PRAGMA busy_timeout = 5000")
+        _copy(source, dest, pages, sleep)
+    finally:
+        source.close()
+        dest.close()
+    return safety_path
+
+
+def main():
+    from db.db_backend import get_db_path
+    from db.db_manager import create_snapshot as snapshot, restore_snapshot as restore
+
+    parser = argparse.ArgumentParser(description="Snapshots en caliente de la base de datos del roadmap")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    create_parser = subparsers.add_parser("snapshot", help="Crea un snapshot")
+    create_parser.add_argument("--keep", type=int, default=BACKUP_RETENTION, help="Snapshots a conservar (0 = todos)")
+    subparsers.add_parser("list", help="Lista los snapshots")
+    restore_parser = subparsers.add_parser("restore", help="Restaura un snapshot")
+    restore_parser.add_argument("path", help="Ruta del snapshot a restaurar")
+    prune_parser = subparsers.add_parser("prune", help="Borra los snapshots antiguos")
+    prune_parser.add_argument("--keep", type=int, default=BACKUP_RETENTION)
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        print(f"✅ Snapshot creado: {snapshot(retention=args.keep)}")
+    elif args.command == "list":
+        for path, created, size in list_snapshots(get_db_path()):
+            print(f"{created:%Y-%m-%d %H:%M:%S}  {size / 1024:8.1f} KB  {path}")
+    elif args.command == "restore":
+        safety_path = restore(args.path)
+        print(f"✅ Restaurado {args.path} (estado anterior guardado en {safety_path})")
+    elif args.command == "prune":
+        removed = prune_snapshots(get_db_path(), keep=args.keep)
+        print(f"🗑️ Borrados {len(removed)} snapshots")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Caché de lecturas de db_manager
+Guarda los resultados de las consultas más frecuentes con desalojo LRU y los invalida
+cuando escribimos nosotros o cuando PRAGMA data_version indica que otro proceso escribió
+"""
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_SIZE = int(os.getenv('ROADMAP_DB_CACHE_SIZE', 256))  # 0 desactiva la caché
+
+
+class ReadCache:
+    def __init__(self, db_path, maxsize=DEFAULT_CACHE_SIZE):
+        """
+        Inicializa la caché de lecturas de una base de datos
+
+        Args:
+            db_path: Ruta del archivo SQLite vigilado
+            maxsize: Número máximo de resultados guardados (0 = sin caché)
+        """
+        self.db_path = db_path
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._watcher = None
+        self._data_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_data_version(self):
+        """Vacía la caché si otra conexión hizo commit desde la última comprobación"""
+        with self._lock:
+            if self._watcher is None:
+                # Conexión dedicada: su data_version cambia con los commits de cualquier otra
+                self._watcher = sqlite3.connect(self.db_path, check_same_thread=False, uri=True)
+            version = self._watcher.execute("PRAGMA data_version").fetchone()[0]
+            if version != self._data_version:
+                if self._data_version is not None:
+                    self._clear_locked()
+                self._data_version = version
+
+    def _clear_locked(self):
+        self._generation += 1
+        self._entries.clear()
+        self.invalidations += 1
+
+    def get_or_load(self, key, loader):
+        """Retorna el valor guardado para key o lo calcula con loader() y lo guarda"""
+        if self.maxsize <= 0:
+            return loader()
+
+        self._check_data_version()
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+
+        with self._lock:
+            # Si hubo una escritura mientras cargábamos, el valor puede estar viejo
+            if generation == self._generation:
+                self._entries[key] = value
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self):
+        """Descarta todos los resultados guardados"""
+        with self._lock:
+            self._clear_locked()
+
+    def stats(self):
+        """Contadores de uso de la caché"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+    def close(self):
+        with self._lock:
+            self._entries.clear()
+            if self._watcher is not None:
+                self._watcher.close()
+                self._watcher = None
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(db_path):
+    """Devuelve la caché asociada a una base de datos, creándola si no existe"""
+    cache = _caches.get(db_path)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(db_path)
+            if cache is None:
+                cache = ReadCache(db_path)
+                _caches[db_path] = cache
+    return cache
+
+
+def close_cache(db_path):
+    """Cierra y olvida la caché de una base de datos"""
+    with _caches_lock:
+        cache = _caches.pop(db_path, None)
+    if cache is not None:
+        cache.close()
+
+
+def close_caches():
+    """Cierra todas las cachés y sus conexiones de vigilancia"""
+    with _caches_lock:
+        caches = list(_caches.values())
+        _caches.clear()
+    for cache in caches:
+        cache.close()
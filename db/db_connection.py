@@ -0,0 +1,251 @@
+"""
+Gestión de conexiones SQLite reutilizables
+Mantiene un pool acotado por base de datos y aplica los PRAGMA una sola vez por conexión.
+El perfil de almacenamiento por defecto usa WAL para que los lectores (reportes,
+panel de debug) no bloqueen a los escritores (checkboxes del tablero).
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from db.db_instrumentation import InstrumentedConnection
+
+DEFAULT_POOL_SIZE = int(os.getenv('ROADMAP_DB_POOL_SIZE', 5))
+DEFAULT_POOL_TIMEOUT = float(os.getenv('ROADMAP_DB_POOL_TIMEOUT', 30))
+
+# Perfiles de almacenamiento: PRAGMA aplicados al abrir cada conexión (en orden)
+STORAGE_PROFILES = {
+    # Varias sesiones de Streamlit leyendo y escribiendo a la vez
+    'concurrent': {
+        'foreign_keys': 'ON',         # SQLite no aplica FOREIGN KEY ni ON DELETE CASCADE si no se activa
+        'busy_timeout': 5000,         # ms esperando un lock antes de "database is locked"
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',      # en WAL no corrompe; solo arriesga el último commit ante un corte de luz
+        'cache_size': -16000,         # ~16 MB de caché de páginas por conexión
+        'mmap_size': 134217728,       # 128 MB de lectura mapeada en memoria
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 1000,   # páginas de WAL antes del checkpoint automático
+    },
+    # Igual que 'concurrent' pero con fsync en cada commit
+    'durable': {
+        'foreign_keys': 'ON',
+        'busy_timeout': 5000,
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -16000,
+        'mmap_size': 134217728,
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 1000,
+    },
+    # Journal clásico de rollback (comportamiento original)
+    'legacy': {
+        'foreign_keys': 'ON',
+        'busy_timeout': 5000,
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'cache_size': -8000,
+        'temp_store': 'MEMORY',
+    },
+    # Copias de solo lectura (snapshots de db_backup) para reportes: no tocan el journal
+    'snapshot': {
+        'foreign_keys': 'ON',
+        'query_only': 'ON',
+        'cache_size': -16000,
+        'mmap_size': 134217728,
+        'temp_store': 'MEMORY',
+    },
+}
+
+DEFAULT_PROFILE = os.getenv('ROADMAP_DB_PROFILE', 'concurrent')
+
+# Checkpoint PASSIVE periódico del WAL además del automático (segundos, 0 = desactivado)
+CHECKPOINT_INTERVAL = float(os.getenv('ROADMAP_DB_CHECKPOINT_INTERVAL', 60))
+
+
+def parse_pragma_overrides(text):
+    """Convierte 'cache_size=-32000,mmap_size=0' en un dict de PRAGMA"""
+    overrides = {}
+    for item in filter(None, (part.strip() for part in (text or '').split(','))):
+        name, _, value = item.partition('=')
+        overrides[name.strip()] = value.strip()
+    return overrides
+
+
+def get_profile_pragmas(profile=None, overrides=None):
+    """Retorna los PRAGMA de un perfil combinados con ROADMAP_DB_PRAGMAS y los overrides dados"""
+    profile = profile or DEFAULT_PROFILE
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(f"Perfil de almacenamiento desconocido: {profile}")
+    pragmas = dict(STORAGE_PROFILES[profile])
+    pragmas.update(parse_pragma_overrides(os.getenv('ROADMAP_DB_PRAGMAS')))
+    pragmas.update(overrides or {})
+    return pragmas
+
+
+class ConnectionPool:
+    def __init__(self, db_path, size=DEFAULT_POOL_SIZE, profile=None, pragmas=None,
+                 timeout=DEFAULT_POOL_TIMEOUT, checkpoint_interval=CHECKPOINT_INTERVAL):
+        """
+        Inicializa el pool de conexiones
+
+        Args:
+            db_path: Ruta del archivo SQLite
+            size: Número máximo de conexiones abiertas a la vez
+            profile: Perfil de STORAGE_PROFILES (por defecto ROADMAP_DB_PROFILE o 'concurrent')
+            pragmas: PRAGMA adicionales que sobrescriben los del perfil
+            timeout: Segundos a esperar por una conexión libre antes de fallar
+            checkpoint_interval: Segundos entre checkpoints PASSIVE del WAL (0 los desactiva)
+        """
+        if size < 1:
+            raise ValueError("El tamaño del pool debe ser al menos 1")
+        self.db_path = db_path
+        self.size = size
+        self.pragmas = get_profile_pragmas(profile, pragmas)
+        self.timeout = timeout
+        self.checkpoint_interval = checkpoint_interval
+        self._last_checkpoint = time.monotonic()
+        self._idle = queue.LifoQueue()
+        self._all = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self):
+        """Abre una conexión nueva y le aplica los PRAGMA configurados"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, uri=True,
+                               factory=InstrumentedConnection)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def dedicated_connection(self):
+        """Abre una conexión con los PRAGMA del pool pero fuera de él (para un hilo que la mantiene abierta)"""
+        return self._connect()
+
+    def acquire(self):
+        """Obtiene una conexión libre, creando una nueva si el pool aún no está lleno"""
+        if self._closed:
+            raise RuntimeError("El pool de conexiones está cerrado")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if len(self._all) < self.size:
+                conn = self._connect()
+                self._all.append(conn)
+                return conn
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No hay conexiones libres en el pool de {self.db_path} tras {self.timeout}s")
+
+    def release(self, conn):
+        """Devuelve una conexión al pool, descartando cualquier transacción pendiente"""
+        if conn.in_transaction:
+            conn.rollback()
+        if self._checkpoint_due():
+            self.checkpoint(conn)
+        if self._closed:
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    def _checkpoint_due(self):
+        if not self.checkpoint_interval or str(self.pragmas.get('journal_mode', '')).upper() != 'WAL':
+            return False
+        now = time.monotonic()
+        if now - self._last_checkpoint < self.checkpoint_interval:
+            return False
+        self._last_checkpoint = now
+        return True
+
+    def checkpoint(self, conn=None, mode='PASSIVE'):
+        """
+        Ejecuta un checkpoint del WAL
+
+        PASSIVE copia al archivo principal lo que pueda sin esperar a lectores ni
+        escritores; TRUNCATE además vacía el WAL (útil en tareas de mantenimiento).
+        Retorna (busy, páginas en el WAL, páginas copiadas).
+        """
+        if conn is not None:
+            return conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        with self.connection() as pooled:
+            return pooled.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+
+    @contextmanager
+    def connection(self):
+        """Presta una conexión; hace commit al salir o rollback si hubo una excepción"""
+        conn = self.acquire()
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Cierra las conexiones libres; las prestadas se cierran al devolverse"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path, profile=None):
+    """Devuelve el pool asociado a una base de datos, creándolo (con `profile`) si no existe"""
+    pool = _pools.get(db_path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(db_path)
+            if pool is None:
+                pool = ConnectionPool(db_path, profile=profile)
+                _pools[db_path] = pool
+    return pool
+
+
+def configure_pool(db_path, size=DEFAULT_POOL_SIZE, profile=None, pragmas=None,
+                   timeout=DEFAULT_POOL_TIMEOUT, checkpoint_interval=CHECKPOINT_INTERVAL):
+    """Reemplaza el pool de una base de datos con una nueva configuración"""
+    with _pools_lock:
+        old = _pools.pop(db_path, None)
+        pool = ConnectionPool(db_path, size=size, profile=profile, pragmas=pragmas,
+                              timeout=timeout, checkpoint_interval=checkpoint_interval)
+        _pools[db_path] = pool
+    if old is not None:
+        old.close()
+    return pool
+
+
+def close_pool(db_path):
+    """Cierra y olvida el pool de una base de datos (por ejemplo, antes de borrar un snapshot)"""
+    with _pools_lock:
+        pool = _pools.pop(db_path, None)
+    if pool is not None:
+        pool.close()
+
+
+def close_pools():
+    """Cierra todos los pools abiertos (útil al terminar scripts o pruebas)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
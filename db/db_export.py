@@ -0,0 +1,352 @@
+"""
+Exportación columnar para análisis (Parquet o Arrow IPC)
+Escribe épicas, tareas y métricas (por semana, responsable y estado) en archivos que pandas
+lee en segundos, en lugar de sacar los números de los PDF. Lee la base en lotes dentro de un
+único snapshot de lectura, así la memoria no crece con el tamaño de las tablas. Las
+exportaciones siguientes solo escriben lo cambiado desde la anterior (columna change_seq,
+migración 8) y las filas borradas; load_export las combina. Las semanas movidas al archivo
+histórico (db_archive) se siguen exportando: no son borrados.
+
+    python -m db.db_export                 # incremental (completa la primera vez)
+    python -m db.db_export --full --format arrow
+
+Requiere pyarrow (ver requirements.txt).
+"""
+
+import os
+import glob
+import json
+import datetime
+import argparse
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # dependencia opcional: solo la necesita este módulo
+    pa = pc = pq = None
+
+from db.db_archive import ARCHIVE_SCHEMA, EPIC_COLUMNS, TASK_COLUMNS, union_source
+from db.db_models import Epic, Task
+
+DEFAULT_EXPORT_DIR = "exports"
+EXPORT_CHUNK_SIZE = 10000      # filas leídas y escritas por lote (un row group en Parquet)
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+DEFAULT_FORMAT = 'parquet'
+PARQUET_COMPRESSION = 'zstd'   # Arrow IPC va sin comprimir: se carga con memory map casi sin copiar
+STATE_FILE = "export_state.json"
+# Sube cuando cambia lo que contiene una exportación; un estado de otra versión fuerza una
+# exportación completa (2: las épicas y tareas archivadas se exportan y no dejan marca de borrado)
+EXPORT_VERSION = 2
+
+# Columnas con pocos valores distintos: se cargan como category en pandas
+CATEGORY_COLUMNS = ('week', 'status', 'owner', 'entity')
+
+
+def _schema(columns):
+    """Esquema Arrow para una lista de (columna, tipo)"""
+    return pa.schema([pa.field(name, dtype) for name, dtype in columns])
+
+
+def _sources(include_archive):
+    """Tablas de épicas y tareas a leer: las de la base caliente o su unión con el archivo adjunto"""
+    if include_archive:
+        return union_source('epics', EPIC_COLUMNS), union_source('tasks', TASK_COLUMNS)
+    return 'epics', 'tasks'
+
+
+def _entity_tables():
+    """Tablas exportadas fila a fila: (nombre, columnas seleccionadas, esquema)"""
+    epic_types = {'id': pa.int64(), 'tasks_total': pa.int64(), 'tasks_completed': pa.int64(),
+                  'iso_year': pa.int32(), 'iso_week': pa.int32()}
+    task_types = {'id': pa.int64(), 'epic_id': pa.int64(), 'priority_rank': pa.int8()}
+    return [
+        ('epics', f"{Epic.columns()}, change_seq",
+         _schema([(field, epic_types.get(field, pa.string())) for field in Epic.FIELDS] + [('change_seq', pa.int64())])),
+        ('tasks', f"{Task.columns()}, change_seq",
+         _schema([(field, task_types.get(field, pa.string())) for field in Task.FIELDS] + [('change_seq', pa.int64())])),
+    ]
+
+
+def _deleted_schema():
+    return _schema([('change_seq', pa.int64()), ('entity', pa.string()), ('entity_id', pa.int64())])
+
+
+def _metric_tables(epics='epics', tasks='tasks'):
+    """Métricas recalculadas en cada exportación sobre las tablas dadas: (nombre, SQL, esquema)"""
+    return [
+        ('metrics_week', f"""
+            SELECT iso_year, iso_week, week, COUNT(*),
+                   SUM(status = 'Pendiente'), SUM(status = 'En progreso'), SUM(status = 'Hecho'),
+                   SUM(tasks_total), SUM(tasks_completed)
+            FROM {epics}
+            GROUP BY iso_year, iso_week, week
+            ORDER BY iso_year, iso_week, week
+        """, _schema([('iso_year', pa.int32()), ('iso_week', pa.int32()), ('week', pa.string()),
+                      ('epics', pa.int64()), ('epics_pending', pa.int64()), ('epics_in_progress', pa.int64()),
+                      ('epics_done', pa.int64()), ('tasks_total', pa.int64()), ('tasks_completed', pa.int64())])),
+        ('metrics_owner', f"""
+            SELECT owner, COUNT(*), SUM(status = 'Completado'), COUNT(DISTINCT epic_id)
+            FROM {tasks}
+            GROUP BY owner
+            ORDER BY owner
+        """, _schema([('owner', pa.string()), ('tasks_total', pa.int64()), ('tasks_completed', pa.int64()),
+                      ('epics', pa.int64())])),
+        ('metrics_status', f"""
+            SELECT 'epic', iso_year, iso_week, status, COUNT(*)
+            FROM {epics}
+            GROUP BY iso_year, iso_week, status
+            UNION ALL
+            SELECT 'task', e.iso_year, e.iso_week, t.status, COUNT(*)
+            FROM {tasks} t JOIN {epics} e ON e.id = t.epic_id
+            GROUP BY e.iso_year, e.iso_week, t.status
+            ORDER BY 1, 2, 3, 4
+        """, _schema([('entity', pa.string()), ('iso_year', pa.int32()), ('iso_week', pa.int32()),
+                      ('status', pa.string()), ('count', pa.int64())])),
+    ]
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("La exportación columnar necesita pyarrow: pip install pyarrow")
+
+
+def _record_batch(rows, schema):
+    """Convierte una lista de tuplas en un RecordBatch columna a columna"""
+    columns = zip(*rows)
+    return pa.RecordBatch.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                                      schema=schema)
+
+
+def _open_writer(path, schema, fmt):
+    if fmt == 'parquet':
+        return pq.ParquetWriter(path, schema, compression=PARQUET_COMPRESSION)
+    return pa.ipc.new_file(path, schema)
+
+
+def _write_rows(cursor, path, schema, fmt, chunk_size, keep_empty=False):
+    """
+    Escribe las filas de un cursor lote a lote en `path` (vía un .tmp que se renombra al final)
+
+    Solo hay `chunk_size` filas en memoria a la vez. Sin filas no crea el archivo, salvo
+    con keep_empty. Retorna las filas escritas.
+    """
+    rows = cursor.fetchmany(chunk_size)
+    if not rows and not keep_empty:
+        return 0
+    tmp_path = path + ".tmp"
+    writer = _open_writer(tmp_path, schema, fmt)
+    written = 0
+    try:
+        while rows:
+            writer.write_batch(_record_batch(rows, schema))
+            written += len(rows)
+            rows = cursor.fetchmany(chunk_size)
+        writer.close()
+    except BaseException:
+        writer.close()
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return written
+
+
+def _parts(output_dir, table, fmt):
+    """Partes de una tabla en orden de exportación (el nombre lleva la secuencia con ceros a la izquierda)"""
+    return sorted(glob.glob(os.path.join(output_dir, table, f"part-*{FORMATS[fmt]}")))
+
+
+def load_state(output_dir=DEFAULT_EXPORT_DIR):
+    """Estado de la última exportación en `output_dir` (None si aún no hay ninguna)"""
+    path = os.path.join(output_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_state(output_dir, state):
+    path = os.path.join(output_dir, STATE_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _clear_export(output_dir):
+    """Borra las partes y métricas de una exportación anterior (antes de una exportación completa)"""
+    for fmt, ext in FORMATS.items():
+        for table in ('epics', 'tasks', 'deleted_rows'):
+            for path in _parts(output_dir, table, fmt):
+                os.remove(path)
+        for name, _, _ in _metric_tables():
+            path = os.path.join(output_dir, name + ext)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def export_columnar(conn, output_dir=DEFAULT_EXPORT_DIR, fmt=DEFAULT_FORMAT, full=False, chunk_size=EXPORT_CHUNK_SIZE,
+                    include_archive=False):
+    """
+    Exporta épicas, tareas y métricas a Parquet o Arrow IPC
+
+    Args:
+        conn: Conexión a la base de datos (fuera de una transacción)
+        output_dir: Directorio de la exportación; guarda su estado en export_state.json
+        fmt: 'parquet' o 'arrow' (Arrow IPC, se lee con memory map)
+        full: Reescribir todo; si no, solo las filas cambiadas o borradas desde la última
+              exportación (la primera vez, o al cambiar de formato, siempre es completa)
+        chunk_size: Filas por lote de lectura y escritura
+        include_archive: El archivo histórico está adjunto como 'archive': exportar también
+                         sus filas (las movidas ahí no cuentan como borradas)
+
+    Cada exportación añade una parte part-<secuencia> en epics/, tasks/ y deleted_rows/
+    y reemplaza las métricas. Retorna un dict con las filas escritas por tabla, el rango
+    de secuencia exportado y la duración.
+    """
+    _require_pyarrow()
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato de exportación desconocido: {fmt}")
+    started = datetime.datetime.now()
+    state = load_state(output_dir)
+    full = full or state is None or state['format'] != fmt or state.get('version') != EXPORT_VERSION
+    since = -1 if full else state['change_seq']
+    ext = FORMATS[fmt]
+    epics, tasks = _sources(include_archive)
+
+    if conn.in_transaction:
+        conn.commit()
+    # Una sola transacción de lectura: filas, borrados, métricas y secuencia son del mismo instante
+    conn.execute("BEGIN")
+    try:
+        upto = conn.execute("SELECT value FROM change_sequence").fetchone()[0]
+        rows = {}
+        if full or upto != since:
+            if full:
+                _clear_export(output_dir)
+            part = f"part-{upto:012d}{ext}"
+            for (table, columns, schema), source in zip(_entity_tables(), (epics, tasks)):
+                os.makedirs(os.path.join(output_dir, table), exist_ok=True)
+                # Completa en orden de id (recorre la tabla); incremental por el índice de change_seq
+                order = "id" if full else "change_seq, id"
+                cursor = conn.execute(f"SELECT {columns} FROM {source} WHERE change_seq > ? ORDER BY {order}", (since,))
+                rows[table] = _write_rows(cursor, os.path.join(output_dir, table, part), schema, fmt, chunk_size)
+            if not full:
+                os.makedirs(os.path.join(output_dir, 'deleted_rows'), exist_ok=True)
+                # Marcas que dejaron los movimientos al archivo antes de la migración 10: la fila
+                # sigue viva en el archivo, no se exporta como borrada
+                moved = f"""
+                    AND NOT EXISTS (SELECT 1 FROM {ARCHIVE_SCHEMA}.epics a WHERE d.entity = 'epic' AND a.id = d.entity_id)
+                    AND NOT EXISTS (SELECT 1 FROM {ARCHIVE_SCHEMA}.tasks a WHERE d.entity = 'task' AND a.id = d.entity_id)
+                """ if include_archive else ""
+                cursor = conn.execute(f"""
+                    SELECT change_seq, entity, entity_id FROM deleted_rows d WHERE change_seq > ? {moved}
+                    ORDER BY change_seq
+                """, (since,))
+                rows['deleted_rows'] = _write_rows(cursor, os.path.join(output_dir, 'deleted_rows', part),
+                                                   _deleted_schema(), fmt, chunk_size)
+            for name, sql, schema in _metric_tables(epics, tasks):
+                rows[name] = _write_rows(conn.execute(sql), os.path.join(output_dir, name + ext), schema, fmt,
+                                         chunk_size, keep_empty=True)
+    finally:
+        conn.rollback()
+
+    if rows:
+        _save_state(output_dir, {
+            'version': EXPORT_VERSION,
+            'format': fmt,
+            'change_seq': upto,
+            'exported_at': started.isoformat(timespec='seconds'),
+            'full_export_at': started.isoformat(timespec='seconds') if full else state['full_export_at'],
+        })
+    return {
+        'full': full,
+        'format': fmt,
+        'since': since,
+        'change_seq': upto,
+        'rows': rows,
+        'seconds': round((datetime.datetime.now() - started).total_seconds(), 3),
+    }
+
+
+def _read_file(path, fmt, columns=None):
+    if fmt == 'parquet':
+        return pq.read_table(path, columns=columns)
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.select(columns) if columns else table
+
+
+def _to_pandas(table):
+    return table.to_pandas(categories=[name for name in CATEGORY_COLUMNS if name in table.column_names],
+                           split_blocks=True)
+
+
+def load_table(table, output_dir=DEFAULT_EXPORT_DIR, columns=None):
+    """
+    Carga una tabla exportada como DataFrame de pandas
+
+    Args:
+        table: 'epics', 'tasks', 'metrics_week', 'metrics_owner' o 'metrics_status'
+        output_dir: Directorio de la exportación
+        columns: Columnas a leer (None = todas); Parquet solo lee esas del disco
+
+    Para épicas y tareas combina las partes: queda la última versión de cada fila y
+    se quitan las borradas.
+    """
+    _require_pyarrow()
+    state = load_state(output_dir)
+    if state is None:
+        raise FileNotFoundError(f"No hay ninguna exportación en {output_dir}")
+    fmt = state['format']
+    if table.startswith('metrics_'):
+        return _to_pandas(_read_file(os.path.join(output_dir, table + FORMATS[fmt]), fmt, columns))
+
+    entity_tables = {name: schema for name, _, schema in _entity_tables()}
+    if table not in entity_tables:
+        raise ValueError(f"Tabla exportada desconocida: {table}")
+    read_columns = columns if columns is None else list(dict.fromkeys(['id', 'change_seq', *columns]))
+    parts = [_read_file(path, fmt, read_columns) for path in _parts(output_dir, table, fmt)]
+    if not parts:
+        return _to_pandas(entity_tables[table].empty_table().select(read_columns or entity_tables[table].names))
+    # Las partes van en orden de secuencia: la última aparición de un id es su versión actual
+    df = _to_pandas(pa.concat_tables(parts)).drop_duplicates('id', keep='last')
+    # Una exportación que solo borró filas no deja parte de la tabla, pero sí en deleted_rows
+    deleted = [_read_file(path, fmt) for path in _parts(output_dir, 'deleted_rows', fmt)]
+    if deleted:
+        deleted = pa.concat_tables(deleted)
+        entity = table[:-1]  # 'epics' -> 'epic'
+        deleted = deleted.filter(pc.equal(deleted['entity'], entity)).to_pandas()
+        # Una fila se quita si su borrado es posterior a su última versión
+        deleted_at = deleted.groupby('entity_id')['change_seq'].max()
+        df = df[~(df['id'].map(deleted_at) > df['change_seq'])]
+    df = df.sort_values('id', ignore_index=True)
+    return df[columns] if columns is not None else df
+
+
+def load_export(output_dir=DEFAULT_EXPORT_DIR):
+    """Carga toda la exportación; retorna {tabla: DataFrame} con épicas, tareas y métricas"""
+    names = [name for name, _, _ in _entity_tables()] + [name for name, _, _ in _metric_tables()]
+    return {name: load_table(name, output_dir) for name in names}
+
+
+def main():
+    from db.db_manager import export_columnar as export
+
+    parser = argparse.ArgumentParser(description="Exporta el roadmap a Parquet/Arrow para análisis")
+    parser.add_argument("--output", default=DEFAULT_EXPORT_DIR, help="Directorio de la exportación")
+    parser.add_argument("--format", choices=sorted(FORMATS), default=DEFAULT_FORMAT, help="Formato de los archivos")
+    parser.add_argument("--full", action="store_true", help="Reescribir todo en lugar de solo lo cambiado")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="Filas por lote")
+    args = parser.parse_args()
+
+    result = export(output_dir=args.output, fmt=args.format, full=args.full, chunk_size=args.chunk_size)
+    kind = "completa" if result['full'] else f"incremental desde la secuencia {result['since']}"
+    print(f"📦 Exportación {kind} en {args.output} ({result['format']}, {result['seconds']} s)")
+    if not result['rows']:
+        print("- Sin cambios desde la última exportación")
+    for table, count in result['rows'].items():
+        print(f"- {table}: {count} filas")
+
+
+if __name__ == "__main__":
+    main()
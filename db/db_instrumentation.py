@@ -0,0 +1,285 @@
+"""
+Instrumentación de consultas de db_manager
+Registra por sesión (un rerun de Streamlit, un reporte) cuántas sentencias SQL se ejecutan,
+cuánto tardan, cuántas filas devuelven y el plan de las lentas. Sin una sesión activa
+solo cuesta leer una ContextVar por llamada.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import datetime
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+ENABLED = os.getenv('ROADMAP_DB_INSTRUMENTATION', '0') == '1'
+SLOW_STATEMENT_MS = float(os.getenv('ROADMAP_DB_SLOW_MS', 50))
+DUMP_DIR = os.getenv('ROADMAP_DB_INSTRUMENTATION_DIR')  # si se define, cada sesión se guarda en JSON
+
+_session = ContextVar('roadmap_instrumentation_session', default=None)
+
+# Sentencias sin plan de consulta útil
+_NO_PLAN_PREFIXES = ('BEGIN', 'COMMIT', 'ROLLBACK', 'PRAGMA', 'ATTACH', 'DETACH', 'SAVEPOINT', 'RELEASE')
+
+
+class StatementRecord:
+    __slots__ = ('sql', 'params', 'function', 'ms', 'rows', 'plan', 'flagged')
+
+    def __init__(self, sql, params, function):
+        self.sql = " ".join(sql.split())
+        self.params = params
+        self.function = function
+        self.ms = 0.0
+        self.rows = 0
+        self.plan = None
+        self.flagged = False  # ya está en slow_statements (plan queda None si no aplica)
+
+    def to_dict(self):
+        return {'sql': self.sql, 'params': repr(self.params), 'function': self.function,
+                'ms': round(self.ms, 3), 'rows': self.rows, 'plan': self.plan}
+
+
+class Session:
+    def __init__(self, label, slow_ms=SLOW_STATEMENT_MS, parent=None):
+        """
+        Acumula las métricas de base de datos de una unidad de trabajo
+
+        Args:
+            label: Nombre de la sesión ('rerun', 'report', ...)
+            slow_ms: Umbral en ms a partir del cual se guarda el plan de la sentencia
+            parent: Sesión que la contiene (un reporte generado dentro de un rerun)
+        """
+        self.label = label
+        self.slow_ms = slow_ms
+        self.parent = parent
+        self.started_at = datetime.datetime.now()
+        self._started = time.perf_counter()
+        self.elapsed_ms = None  # None mientras la sesión no termina (o si un st.rerun la cortó)
+        self.statements = 0
+        self.db_ms = 0.0
+        self.rows = 0
+        self.functions = {}
+        self.slow_statements = []
+        self.children = []
+        # Las consultas de db_async corren en otros hilos con la misma sesión: cada hilo
+        # lleva su propia pila de funciones y los contadores se actualizan con el lock
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _function_stats(self, name):
+        stats = self.functions.get(name)
+        if stats is None:
+            stats = {'calls': 0, 'ms': 0.0, 'statements': 0, 'db_ms': 0.0, 'rows': 0}
+            self.functions[name] = stats
+        return stats
+
+    def new_statement(self, sql, params):
+        stack = self._stack
+        function = stack[-1] if stack else None
+        with self._lock:
+            self.statements += 1
+            if function:
+                self._function_stats(function)['statements'] += 1
+        return StatementRecord(sql, params, function)
+
+    def add_time(self, record, conn, ms, rows=0):
+        """Suma tiempo y filas a una sentencia (su ejecución o una lectura de resultados)"""
+        record.ms += ms
+        record.rows += rows
+        with self._lock:
+            self.db_ms += ms
+            self.rows += rows
+            if record.function:
+                stats = self._function_stats(record.function)
+                stats['db_ms'] += ms
+                stats['rows'] += rows
+        if not record.flagged and record.ms >= self.slow_ms:
+            record.flagged = True
+            record.plan = explain(conn, record.sql, record.params)
+            self.slow_statements.append(record)
+
+    def add_call(self, name, ms):
+        """Suma una llamada a una función de db_manager"""
+        with self._lock:
+            stats = self._function_stats(name)
+            stats['calls'] += 1
+            stats['ms'] += ms
+
+    def finish(self):
+        if self.elapsed_ms is None:
+            self.elapsed_ms = (time.perf_counter() - self._started) * 1000
+
+    def to_dict(self):
+        return {
+            'label': self.label,
+            'started_at': self.started_at.isoformat(timespec='milliseconds'),
+            'elapsed_ms': round(self.elapsed_ms, 3) if self.elapsed_ms is not None else None,
+            'statements': self.statements,
+            'db_ms': round(self.db_ms, 3),
+            'rows': self.rows,
+            'functions': {name: {key: round(value, 3) if isinstance(value, float) else value
+                                 for key, value in stats.items()}
+                          for name, stats in sorted(self.functions.items(), key=lambda item: -item[1]['ms'])},
+            'slow_statements': [record.to_dict() for record in self.slow_statements],
+            'children': [child.to_dict() for child in self.children],
+        }
+
+    def dump(self, path):
+        """Guarda la sesión como JSON y retorna la ruta"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+def explain(conn, sql, params):
+    """Detalle de EXPLAIN QUERY PLAN de una sentencia (None si no aplica)"""
+    if sql.lstrip().upper().startswith(_NO_PLAN_PREFIXES) or not isinstance(params, (tuple, list, dict)):
+        return None
+    try:
+        rows = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    except sqlite3.Error as e:
+        return [f"(sin plan: {e})"]
+    return [row[3] for row in rows]
+
+
+def current_session():
+    """Sesión activa en este contexto o None"""
+    return _session.get()
+
+
+def start_session(label, slow_ms=SLOW_STATEMENT_MS):
+    """
+    Abre una sesión para el resto del contexto actual y la retorna
+
+    Pensado para scripts de Streamlit, donde el rerun puede cortarse con st.rerun() y
+    no hay un bloque `with` que cerrar; la siguiente llamada reemplaza a la anterior.
+    """
+    session = Session(label, slow_ms)
+    _session.set(session)
+    return session
+
+
+def end_session():
+    """Cierra la sesión activa (si hay) y la retorna"""
+    session = _session.get()
+    if session is not None:
+        session.finish()
+        _session.set(None)
+    return session
+
+
+@contextmanager
+def session(label, slow_ms=SLOW_STATEMENT_MS, force=False):
+    """
+    Registra las consultas del bloque en una sesión propia
+
+    Solo mide si la instrumentación está habilitada (ROADMAP_DB_INSTRUMENTATION=1),
+    si ya hay una sesión activa (queda como hija) o con force=True; si no, retorna None.
+    """
+    parent = _session.get()
+    if not (ENABLED or force or parent is not None):
+        yield None
+        return
+    child = Session(label, slow_ms, parent)
+    token = _session.set(child)
+    try:
+        yield child
+    finally:
+        _session.reset(token)
+        child.finish()
+        if parent is not None:
+            parent.children.append(child)
+        elif DUMP_DIR:
+            os.makedirs(DUMP_DIR, exist_ok=True)
+            child.dump(os.path.join(DUMP_DIR, f"{label}_{child.started_at:%Y%m%d_%H%M%S_%f}.json"))
+
+
+def instrumented(func):
+    """Mide llamadas y tiempo total de una función de db_manager cuando hay una sesión activa"""
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        active = _session.get()
+        if active is None:
+            return func(*args, **kwargs)
+        active._stack.append(name)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            active.add_call(name, (time.perf_counter() - start) * 1000)
+            active._stack.pop()
+    return wrapper
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor que atribuye a la sesión activa el tiempo de ejecución y de lectura de filas"""
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        result = method(*args)
+        return result, (time.perf_counter() - start) * 1000
+
+    def execute(self, sql, parameters=()):
+        self._session = _session.get()
+        self._record = self._session.new_statement(sql, parameters)
+        _, ms = self._timed(super().execute, sql, parameters)
+        self._session.add_time(self._record, self.connection, ms)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._session = _session.get()
+        self._record = self._session.new_statement(sql, None)
+        _, ms = self._timed(super().executemany, sql, seq_of_parameters)
+        self._session.add_time(self._record, self.connection, ms)
+        return self
+
+    def fetchone(self):
+        row, ms = self._timed(super().fetchone)
+        self._session.add_time(self._record, self.connection, ms, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        rows, ms = self._timed(super().fetchmany, size or self.arraysize)
+        self._session.add_time(self._record, self.connection, ms, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows, ms = self._timed(super().fetchall)
+        self._session.add_time(self._record, self.connection, ms, len(rows))
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._session.add_time(self._record, self.connection, (time.perf_counter() - start) * 1000)
+            raise
+        self._session.add_time(self._record, self.connection, (time.perf_counter() - start) * 1000, 1)
+        return row
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Conexión que usa InstrumentedCursor solo mientras hay una sesión activa"""
+
+    def execute(self, sql, parameters=()):
+        if _session.get() is None:
+            return super().execute(sql, parameters)
+        return self.cursor(InstrumentedCursor).execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if _session.get() is None:
+            return super().executemany(sql, seq_of_parameters)
+        return self.cursor(InstrumentedCursor).executemany(sql, seq_of_parameters)
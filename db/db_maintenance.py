@@ -0,0 +1,146 @@
+"""
+Mantenimiento de la base de datos
+Borra por lotes las tareas huérfanas (de épicas que ya no existen), actualiza las
+estadísticas del planificador con ANALYZE y devuelve al sistema las páginas libres con
+VACUUM incremental. Informa de las filas y el espacio recuperados.
+"""
+
+import time
+import argparse
+
+MAINTENANCE_BATCH_SIZE = 5000   # tareas huérfanas borradas por transacción
+VACUUM_STEP_PAGES = 1000        # páginas liberadas por paso de incremental_vacuum
+
+# Tablas cuyo número de filas se informa antes y después
+COUNTED_TABLES = ("epics", "tasks", "status_events")
+
+ORPHAN_TASKS_WHERE = "epic_id IS NULL OR NOT EXISTS (SELECT 1 FROM epics WHERE epics.id = tasks.epic_id)"
+
+
+def count_orphan_tasks(conn):
+    """Tareas sin épica (epic_id nulo o de una épica borrada)"""
+    return conn.execute(f"SELECT COUNT(*) FROM tasks WHERE {ORPHAN_TASKS_WHERE}").fetchone()[0]
+
+
+def delete_orphan_tasks(conn, batch_size=MAINTENANCE_BATCH_SIZE):
+    """
+    Borra las tareas huérfanas en lotes, cada uno en su propia transacción
+
+    Los lotes cortos dejan pasar a las escrituras del tablero entre uno y otro; los
+    triggers mantienen el índice de búsqueda. Retorna las tareas borradas.
+    """
+    deleted = 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        batch = conn.execute(f"""
+            DELETE FROM tasks WHERE id IN (
+                SELECT id FROM tasks WHERE {ORPHAN_TASKS_WHERE} LIMIT ?
+            )
+        """, (batch_size,)).rowcount
+        conn.commit()
+        deleted += batch
+        if batch < batch_size:
+            return deleted
+
+
+def _storage_stats(conn):
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return {
+        'page_size': page_size,
+        'pages': conn.execute("PRAGMA page_count").fetchone()[0],
+        'free_pages': conn.execute("PRAGMA freelist_count").fetchone()[0],
+        'rows': {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in COUNTED_TABLES},
+    }
+
+
+def incremental_vacuum(conn, step_pages=VACUUM_STEP_PAGES):
+    """
+    Devuelve las páginas libres al sistema operativo en pasos de `step_pages`
+
+    Si la base no está en auto_vacuum INCREMENTAL (bases creadas antes de este cambio),
+    la convierte primero con un VACUUM completo, que reescribe el archivo una sola vez.
+    Retorna True si hubo que hacer esa conversión.
+    """
+    converted = False
+    if conn.in_transaction:
+        conn.commit()
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        converted = True
+    while conn.execute("PRAGMA freelist_count").fetchone()[0]:
+        # executescript avanza la sentencia hasta el final; execute solo liberaría una página
+        conn.executescript(f"PRAGMA incremental_vacuum({step_pages})")
+    return converted
+
+
+def run_maintenance(conn, batch_size=MAINTENANCE_BATCH_SIZE, analyze=True, vacuum=True):
+    """
+    Ejecuta el mantenimiento completo sobre una conexión
+
+    Args:
+        conn: Conexión a la base de datos (fuera de una transacción)
+        batch_size: Tareas huérfanas borradas por transacción
+        analyze: Actualizar las estadísticas del planificador (ANALYZE)
+        vacuum: Devolver las páginas libres con VACUUM incremental
+
+    Retorna un dict con las filas y bytes antes/después, las huérfanas borradas y la duración.
+    """
+    started = time.perf_counter()
+    before = _storage_stats(conn)
+
+    orphans = delete_orphan_tasks(conn, batch_size)
+    if analyze:
+        conn.execute("ANALYZE")
+        conn.commit()
+    converted = incremental_vacuum(conn) if vacuum else False
+    # Vaciar el WAL para que el tamaño del archivo refleje lo recuperado
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+
+    after = _storage_stats(conn)
+    bytes_before = before['pages'] * before['page_size']
+    bytes_after = after['pages'] * after['page_size']
+    return {
+        'orphan_tasks_deleted': orphans,
+        'rows_before': before['rows'],
+        'rows_after': after['rows'],
+        'bytes_before': bytes_before,
+        'bytes_after': bytes_after,
+        'bytes_reclaimed': bytes_before - bytes_after,
+        'free_pages_before': before['free_pages'],
+        'free_pages_after': after['free_pages'],
+        'analyzed': analyze,
+        'converted_to_incremental': converted,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def _format_bytes(size):
+    return f"{size / 1024 / 1024:.2f} MB" if abs(size) >= 1024 * 1024 else f"{size / 1024:.1f} KB"
+
+
+def main():
+    from db.db_backend import get_db_path
+    from db.db_manager import run_maintenance as maintenance
+
+    parser = argparse.ArgumentParser(description="Mantenimiento de la base de datos del roadmap")
+    parser.add_argument("--batch-size", type=int, default=MAINTENANCE_BATCH_SIZE, help="Tareas huérfanas por lote")
+    parser.add_argument("--no-analyze", action="store_true", help="No ejecutar ANALYZE")
+    parser.add_argument("--no-vacuum", action="store_true", help="No ejecutar VACUUM incremental")
+    args = parser.parse_args()
+
+    result = maintenance(batch_size=args.batch_size, analyze=not args.no_analyze, vacuum=not args.no_vacuum)
+    print(f"🧹 Mantenimiento de {get_db_path()} ({result['seconds']} s)")
+    print(f"- Tareas huérfanas borradas: {result['orphan_tasks_deleted']}")
+    for table in COUNTED_TABLES:
+        print(f"- {table}: {result['rows_before'][table]} -> {result['rows_after'][table]} filas")
+    if result['converted_to_incremental']:
+        print("- Base convertida a auto_vacuum INCREMENTAL (VACUUM completo)")
+    print(f"- Tamaño: {_format_bytes(result['bytes_before'])} -> {_format_bytes(result['bytes_after'])} "
+          f"({_format_bytes(result['bytes_reclaimed'])} recuperados)")
+    if result['analyzed']:
+        print("- Estadísticas del planificador actualizadas (ANALYZE)")
+
+
+if __name__ == "__main__":
+    main()
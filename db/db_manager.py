@@ -1,112 +1,701 @@
-import sqlite3
+import datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from db.db_connection import get_pool
+from db.db_backend import get_db_path
+from db.db_cache import get_cache
+from db.db_instrumentation import instrumented
+from db.db_weeks import parse_week_label, format_week_label, week_window, week_bounds
+from db import db_archive
+from db.db_archive import EPIC_COLUMNS, TASK_COLUMNS, ensure_archive_attached, union_source
+from db import db_backup
+from db import db_writer
+from db import db_maintenance
+from db.db_migrations import migrate
+from db.db_models import Epic, Task, PRIORITY_RANKS
 
-DB_PATH = "roadmap.db"
+# Base de datos de lectura del contexto actual (None = la del backend); ver reading_from
+_read_path = ContextVar('roadmap_read_path', default=None)
+
+def _current_path():
+    return _read_path.get() or get_db_path()
 
 def get_connection():
-    return sqlite3.connect(DB_PATH)
+    """Presta una conexión del pool (usar con `with`); hace commit al salir del bloque"""
+    path = _read_path.get()
+    if path:
+        return get_pool(path, profile='snapshot').connection()
+    return get_pool(get_db_path()).connection()
+
+@contextmanager
+def reading_from(path):
+    """Dirige las funciones de este módulo a un snapshot de solo lectura dentro del bloque"""
+    token = _read_path.set(path)
+    try:
+        yield path
+    finally:
+        _read_path.reset(token)
+
+def cached_read(func):
+    """Sirve la lectura desde la caché mientras la base de datos no cambie (no mutar el resultado)"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        return get_cache(_current_path()).get_or_load(key, lambda: func(*args, **kwargs))
+    return wrapper
+
+def invalidates_cache(func):
+    """Vacía la caché de lecturas después de una escritura"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            get_cache(get_db_path()).invalidate()
+    return wrapper
+
+def _write(op, *args):
+    """
+    Ejecuta op(conn, *args) como escritura y retorna su resultado
+
+    Con el escritor único activo (ver db_writer) se encola y se confirma junto a las
+    escrituras concurrentes; si no, usa una conexión del pool en su propia transacción.
+    """
+    path = get_db_path()
+    if db_writer.uses_writer(path):
+        return db_writer.get_writer(path).submit(op, *args).result()
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        return op(conn, *args)
+
+def get_cache_stats():
+    """Aciertos, fallos y tamaño de la caché de lecturas"""
+    return get_cache(get_db_path()).stats()
+
+# ---- SNAPSHOTS ----
+@instrumented
+def create_snapshot(retention=db_backup.BACKUP_RETENTION):
+    """Snapshot en caliente de la base de datos (ver db_backup.create_snapshot); retorna su ruta"""
+    return db_backup.create_snapshot(get_db_path(), retention=retention)
+
+@instrumented
+@invalidates_cache
+def restore_snapshot(snapshot_path):
+    """Restaura un snapshot sobre la base en uso y la lleva a la última versión de esquema"""
+    with db_writer.exclusive(get_db_path()):
+        safety_path = db_backup.restore_snapshot(snapshot_path, get_db_path())
+        with get_connection() as conn:
+            migrate(conn)
+    return safety_path
+
+@contextmanager
+def reading_snapshot(max_age=300):
+    """
+    Lee desde un snapshot reciente en lugar de la base en uso (para reportes)
+
+    Reutiliza el último snapshot si tiene menos de `max_age` segundos; si no, crea uno.
+    """
+    path = db_backup.latest_snapshot(get_db_path(), max_age=max_age) or create_snapshot()
+    with reading_from(path):
+        yield path
+
+# ---- ARCHIVO HISTÓRICO ----
+# Las lecturas de historia unen el archivo adjunto por defecto (include_archive=True): archivar
+# una semana no la quita del tablero ni de los reportes. Sin archivo, leen solo la base caliente
+# (la unión es db_archive.union_source).
+def _epics_source(conn, include_archive):
+    """Tabla de épicas a consultar: solo la base caliente o unida con el archivo adjunto"""
+    if include_archive and ensure_archive_attached(conn, get_db_path()):
+        return union_source('epics', EPIC_COLUMNS)
+    return "epics"
+
+def _tasks_source(conn, include_archive):
+    """Tabla de tareas a consultar: solo la base caliente o unida con el archivo adjunto"""
+    if include_archive and ensure_archive_attached(conn, get_db_path()):
+        return union_source('tasks', TASK_COLUMNS)
+    return "tasks"
+
+@instrumented
+@invalidates_cache
+def archive_closed_weeks(before=None, batch_size=200, max_batches=None):
+    """
+    Mueve al archivo histórico las épicas 'Hecho' de semanas pasadas con sus tareas
+
+    Ver db_archive.archive_closed_weeks; se puede interrumpir y volver a lanzar. Escribe
+    con sus propias transacciones, con el escritor único en pausa (ver db_writer.exclusive).
+    """
+    with db_writer.exclusive(get_db_path()), get_connection() as conn:
+        return db_archive.archive_closed_weeks(conn, get_db_path(), before=before,
+                                               batch_size=batch_size, max_batches=max_batches)
+
+# ---- MANTENIMIENTO ----
+@instrumented
+@invalidates_cache
+def run_maintenance(batch_size=db_maintenance.MAINTENANCE_BATCH_SIZE, analyze=True, vacuum=True):
+    """
+    Borra tareas huérfanas, ejecuta ANALYZE y VACUUM incremental (ver db_maintenance.run_maintenance)
+
+    Es una operación exclusiva: el escritor único queda en pausa mientras dura.
+    """
+    with db_writer.exclusive(get_db_path()), get_connection() as conn:
+        return db_maintenance.run_maintenance(conn, batch_size=batch_size, analyze=analyze, vacuum=vacuum)
+
+# ---- EXPORTACIÓN ----
+@instrumented
+def export_columnar(output_dir=None, fmt=None, full=False, chunk_size=None):
+    """Exporta épicas, tareas y métricas a Parquet/Arrow para análisis (ver db_export.export_columnar)"""
+    # Import diferido: db_export carga pyarrow, que la app no necesita al arrancar
+    from db import db_export
+
+    with get_connection() as conn:
+        return db_export.export_columnar(conn, output_dir=output_dir or db_export.DEFAULT_EXPORT_DIR,
+                                         fmt=fmt or db_export.DEFAULT_FORMAT, full=full,
+                                         chunk_size=chunk_size or db_export.EXPORT_CHUNK_SIZE,
+                                         include_archive=ensure_archive_attached(conn, get_db_path()))
 
 # ---- EPICS ----
+# Las escrituras están separadas en _op(conn, ...) (el SQL) y la función pública, que
+# las ejecuta con _write
+def _create_epic(conn, name, description, week, status):
+    cursor = conn.execute("INSERT INTO epics (name, description, week, status, iso_year, iso_week) VALUES (?, ?, ?, ?, ?, ?)",
+                          (name, description, week, status, *parse_week_label(week)))
+    return cursor.lastrowid
+
+@instrumented
+@invalidates_cache
 def create_epic(name, description, week, status="Pendiente"):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO epics (name, description, week, status) VALUES (?, ?, ?, ?)",
-                   (name, description, week, status))
-    conn.commit()
-    conn.close()
-
-def get_epics_by_week(week):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM epics WHERE week = ?", (week,))
-    data = cursor.fetchall()
-    conn.close()
-    return data
+    """Crea una épica y retorna su id"""
+    return _write(_create_epic, name, description, week, status)
 
+def _priority_rank(priority):
+    """Rango de una prioridad ('Alta', 'Media' o 'Baja'); ValueError con cualquier otra"""
+    try:
+        return PRIORITY_RANKS[priority]
+    except KeyError:
+        raise ValueError(f"Prioridad no válida: {priority!r} (usar {', '.join(PRIORITY_RANKS)})") from None
+
+def _create_epic_with_tasks(conn, name, description, week, status, tasks):
+    epic_id = _create_epic(conn, name, description, week, status)
+    conn.executemany(
+        "INSERT INTO tasks (title, description, epic_id, owner, priority, priority_rank, status) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(task["title"], task.get("description", ""), epic_id, task.get("owner", ""),
+          task.get("priority", "Media"), _priority_rank(task.get("priority", "Media")), "Pendiente")
+         for task in tasks])
+    return epic_id
+
+@instrumented
+@invalidates_cache
+def create_epic_with_tasks(name, description, week, status="Pendiente", tasks=()):
+    """
+    Crea una épica y todas sus tareas en una sola transacción y retorna el id de la épica
+
+    Args:
+        tasks: Lista de dicts con 'title' y opcionalmente 'description', 'owner' y 'priority'
+    """
+    return _write(_create_epic_with_tasks, name, description, week, status, list(tasks))
+
+@instrumented
+@cached_read
+def get_epics_by_week(week, include_archive=True):
+    """Épicas de una semana (Epic)"""
+    with get_connection() as conn:
+        return Epic.fetch_all(conn.execute(
+            f"SELECT {Epic.columns()} FROM {_epics_source(conn, include_archive)} WHERE week = ?", (week,)))
+
+@instrumented
+@cached_read
+def get_epics_by_week_range(start, end, include_archive=True):
+    """Épicas (Epic) entre dos semanas ISO (tuplas (año, semana), ambas incluidas) en orden cronológico"""
+    with get_connection() as conn:
+        return Epic.fetch_all(conn.execute(f"""
+            SELECT {Epic.columns()} FROM {_epics_source(conn, include_archive)}
+            WHERE (iso_year, iso_week) BETWEEN (?, ?) AND (?, ?)
+            ORDER BY iso_year, iso_week, id
+        """, (*start, *end)))
+
+@instrumented
+@cached_read
+def get_week_options(before=2, after=4, include_archive=True):
+    """
+    Etiquetas de semana para los selectores, en orden cronológico
+
+    Incluye las semanas que tienen épicas (también las archivadas) y una ventana
+    alrededor de la semana actual.
+    """
+    with get_connection() as conn:
+        weeks = set(conn.execute(f"""
+            SELECT DISTINCT iso_year, iso_week FROM {_epics_source(conn, include_archive)}
+            WHERE iso_year IS NOT NULL
+        """).fetchall())
+    weeks.update(week_window(before, after))
+    return [format_week_label(year, week) for year, week in sorted(weeks)]
+
+def _update_epic_status(conn, epic_id, new_status):
+    conn.execute("UPDATE epics SET status = ? WHERE id = ?", (new_status, epic_id))
+
+@instrumented
+@invalidates_cache
 def update_epic_status(epic_id, new_status):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE epics SET status = ? WHERE id = ?", (new_status, epic_id))
-    conn.commit()
-    conn.close()
+    _write(_update_epic_status, epic_id, new_status)
+
+def _delete_epic(conn, epic_id):
+    # ON DELETE CASCADE ya las borra con foreign_keys activo; se borran igual por si la
+    # conexión lo tiene desactivado (ROADMAP_DB_PRAGMAS), para no dejar tareas huérfanas
+    conn.execute("DELETE FROM tasks WHERE epic_id = ?", (epic_id,))
+    conn.execute("DELETE FROM epics WHERE id = ?", (epic_id,))
 
+@instrumented
+@invalidates_cache
 def delete_epic(epic_id):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM epics WHERE id = ?", (epic_id,))
-    conn.commit()
-    conn.close()
-
-def get_all_epics():
-    """Función de debug para ver todas las épicas"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM epics ORDER BY id DESC")
-    data = cursor.fetchall()
-    conn.close()
-    return data
-
-def get_epic_count_by_week():
-    """Función para contar épicas por semana"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT week, COUNT(*) as count FROM epics GROUP BY week")
-    data = cursor.fetchall()
-    conn.close()
-    return data
+    _write(_delete_epic, epic_id)
+
+@instrumented
+def get_all_epics(include_archive=True):
+    """Función de debug para ver todas las épicas (con include_archive, también las archivadas)"""
+    with get_connection() as conn:
+        return Epic.fetch_all(conn.execute(
+            f"SELECT {Epic.columns()} FROM {_epics_source(conn, include_archive)} ORDER BY id DESC"))
+
+DEFAULT_PAGE_SIZE = 50
+
+@instrumented
+def get_epics_page(after_id=None, page_size=DEFAULT_PAGE_SIZE, include_archive=True):
+    """
+    Página de todas las épicas por id descendente (mismo orden y filas que get_all_epics)
+
+    Usa paginación por cursor: pasar como after_id el cursor devuelto por la página
+    anterior. Retorna (épicas, cursor_siguiente); el cursor es None en la última página.
+    """
+    with get_connection() as conn:
+        source = _epics_source(conn, include_archive)
+        if after_id is None:
+            rows = Epic.fetch_all(conn.execute(f"SELECT {Epic.columns()} FROM {source} ORDER BY id DESC LIMIT ?",
+                                               (page_size + 1,)))
+        else:
+            rows = Epic.fetch_all(conn.execute(f"SELECT {Epic.columns()} FROM {source} WHERE id < ? ORDER BY id DESC LIMIT ?",
+                                               (after_id, page_size + 1)))
+    if len(rows) > page_size:
+        return rows[:page_size], rows[page_size - 1].id
+    return rows, None
+
+@instrumented
+def get_epics_by_week_page(week, after_id=None, page_size=DEFAULT_PAGE_SIZE, include_archive=True):
+    """
+    Página de las épicas de una semana por id ascendente
+
+    Retorna (épicas, cursor_siguiente) igual que get_epics_page.
+    """
+    with get_connection() as conn:
+        rows = Epic.fetch_all(conn.execute(f"SELECT {Epic.columns()} FROM {_epics_source(conn, include_archive)} "
+                                           "WHERE week = ? AND id > ? ORDER BY id ASC LIMIT ?",
+                                           (week, after_id or 0, page_size + 1)))
+    if len(rows) > page_size:
+        return rows[:page_size], rows[page_size - 1].id
+    return rows, None
+
+@instrumented
+@cached_read
+def get_epic_count_by_week(include_archive=True):
+    """Función para contar épicas por semana (las archivadas incluidas, como get_epics_page)"""
+    with get_connection() as conn:
+        return conn.execute(f"SELECT week, COUNT(*) as count FROM {_epics_source(conn, include_archive)} "
+                            "GROUP BY week").fetchall()
 
 # ---- TASKS ----
+def _create_task(conn, title, description, epic_id, owner, priority):
+    cursor = conn.execute("INSERT INTO tasks (title, description, epic_id, owner, priority, priority_rank, status) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                          (title, description, epic_id, owner, priority, _priority_rank(priority), "Pendiente"))
+    return cursor.lastrowid
+
+@instrumented
+@invalidates_cache
 def create_task(title, description, epic_id, owner="", priority="Media"):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO tasks (title, description, epic_id, owner, priority, status) VALUES (?, ?, ?, ?, ?, ?)",
-                   (title, description, epic_id, owner, priority, "Pendiente"))
-    conn.commit()
-    conn.close()
-
-def get_tasks_by_epic(epic_id):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM tasks WHERE epic_id = ? ORDER BY priority DESC, id ASC", (epic_id,))
-    data = cursor.fetchall()
-    conn.close()
-    return data
+    """Crea una tarea y retorna su id"""
+    return _write(_create_task, title, description, epic_id, owner, priority)
+
+@instrumented
+@cached_read
+def get_tasks_by_epic(epic_id, include_archive=True):
+    """
+    Tareas (Task) de una épica de mayor a menor prioridad
+    """
+    with get_connection() as conn:
+        return Task.fetch_all(conn.execute(f"""
+            SELECT {Task.columns()}
+            FROM {_tasks_source(conn, include_archive)} WHERE epic_id = ?
+            ORDER BY priority_rank ASC, id ASC
+        """, (epic_id,)))
+
+def _update_task_status(conn, task_id, new_status):
+    conn.execute("UPDATE tasks SET status = ? WHERE id = ?", (new_status, task_id))
 
+@instrumented
+@invalidates_cache
 def update_task_status(task_id, new_status):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE tasks SET status = ? WHERE id = ?", (new_status, task_id))
-    conn.commit()
-    conn.close()
+    _write(_update_task_status, task_id, new_status)
 
+def _delete_task(conn, task_id):
+    conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+@instrumented
+@invalidates_cache
 def delete_task(task_id):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-    conn.commit()
-    conn.close()
+    _write(_delete_task, task_id)
 
+@instrumented
+@cached_read
 def get_task_completion_status(epic_id):
     """Retorna el porcentaje de completación de tareas de una épica"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) as total FROM tasks WHERE epic_id = ?", (epic_id,))
-    total = cursor.fetchone()[0]
-    
-    if total == 0:
-        conn.close()
+    with get_connection() as conn:
+        row = conn.execute("SELECT tasks_completed, tasks_total FROM epics WHERE id = ?", (epic_id,)).fetchone()
+
+    if row is None or row[1] == 0:
         return 0, 0, 0  # completed, total, percentage
-    
-    cursor.execute("SELECT COUNT(*) as completed FROM tasks WHERE epic_id = ? AND status = 'Completado'", (epic_id,))
-    completed = cursor.fetchone()[0]
-    conn.close()
-    
+
+    completed, total = row
     percentage = (completed / total) * 100
     return completed, total, percentage
 
+@instrumented
+def check_task_counters(repair=False):
+    """
+    Verifica que tasks_total/tasks_completed de cada épica coincidan con sus tareas
+
+    Retorna la lista de inconsistencias como tuplas (epic_id, tasks_total, tasks_completed,
+    total_real, completadas_reales). Con repair=True además corrige los contadores.
+    """
+    with get_connection() as conn:
+        mismatches = conn.execute("""
+            SELECT e.id, e.tasks_total, e.tasks_completed,
+                   COUNT(t.id), COALESCE(SUM(t.status = 'Completado'), 0)
+            FROM epics e
+            LEFT JOIN tasks t ON t.epic_id = e.id
+            GROUP BY e.id
+            HAVING e.tasks_total != COUNT(t.id)
+                OR e.tasks_completed != COALESCE(SUM(t.status = 'Completado'), 0)
+        """).fetchall()
+        if repair and mismatches:
+            conn.executemany("UPDATE epics SET tasks_total = ?, tasks_completed = ? WHERE id = ?",
+                             [(total, completed, epic_id) for epic_id, _, _, total, completed in mismatches])
+    if repair and mismatches:
+        get_cache(get_db_path()).invalidate()
+    return mismatches
+
+BOARD_STATES = ["Pendiente", "En progreso", "Hecho"]
+
+@instrumented
+@cached_read
+def get_board_data(week, include_archive=True):
+    """
+    Carga en una sola consulta las épicas de una semana con sus tareas y progreso
+
+    Retorna un dict {estado: [Epic, ...]} con los estados del tablero; cada Epic trae
+    sus tareas (Task) en epic.tasks. Las épicas del archivo histórico llegan con
+    epic.archived = True (solo lectura).
+    """
+    with get_connection() as conn:
+        schemas = [('main', False)]
+        if include_archive and ensure_archive_attached(conn, get_db_path()):
+            schemas.append(('archive', True))
+        rows = []
+        for schema, archived in schemas:
+            # Una épica todavía en la base caliente se muestra desde ahí (ver _epics_source)
+            skip_hot = "AND NOT EXISTS (SELECT 1 FROM main.epics m WHERE m.id = e.id)" if archived else ""
+            rows.extend((archived, row) for row in conn.execute(f"""
+                SELECT {Epic.columns('e')}, {Task.columns('t')}
+                FROM {schema}.epics e
+                LEFT JOIN {schema}.tasks t ON t.epic_id = e.id
+                WHERE e.week = ? {skip_hot}
+                ORDER BY e.id ASC, t.priority_rank ASC, t.id ASC
+            """, (week,)))
+
+    board = {state: [] for state in BOARD_STATES}
+    epic = None
+    split = len(Epic.FIELDS)
+    for archived, row in rows:
+        if epic is None or epic.id != row[0]:
+            epic = Epic(*row[:split])
+            epic.archived = archived
+            board.setdefault(epic.status, []).append(epic)
+        if row[split] is not None:
+            epic.tasks.append(Task(*row[split:]))
+    return board
+
+# ---- BÚSQUEDA ----
+def _fts_query(text):
+    """Convierte el texto del usuario en una consulta FTS5: todos los términos, por prefijo"""
+    terms = [term.replace('"', '""') for term in text.split()]
+    return " ".join(f'"{term}"*' for term in terms)
+
+@instrumented
+@cached_read
+def search(text, limit=20, include_archive=True):
+    """
+    Busca épicas y tareas por texto completo (índices FTS5, ordenados por relevancia)
+
+    Con el archivo histórico adjunto también busca en sus índices propios.
+    Retorna hasta `limit` resultados como dicts con type ('epic' o 'task'), id,
+    epic_id, title, week, status y score (bm25: más bajo = más relevante).
+    """
+    query = _fts_query(text)
+    if not query:
+        return []
+    with get_connection() as conn:
+        schemas = ['main']
+        if include_archive and ensure_archive_attached(conn, get_db_path()):
+            schemas.append('archive')
+        selects = []
+        for schema in schemas:
+            selects.append(f"""
+                SELECT * FROM (
+                    SELECT 'epic', e.id, e.id, e.name, e.week, e.status, f.rank AS score
+                    FROM {schema}.epics_fts f JOIN {schema}.epics e ON e.id = f.rowid
+                    WHERE f.epics_fts MATCH ?
+                    ORDER BY f.rank LIMIT ?
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT 'task', t.id, t.epic_id, t.title, e.week, t.status, f.rank AS score
+                    FROM {schema}.tasks_fts f
+                    JOIN {schema}.tasks t ON t.id = f.rowid
+                    JOIN {schema}.epics e ON e.id = t.epic_id
+                    WHERE f.tasks_fts MATCH ?
+                    ORDER BY f.rank LIMIT ?
+                )
+            """)
+        rows = conn.execute(" UNION ALL ".join(selects) + " ORDER BY score LIMIT ?",
+                            (query, limit, query, limit) * len(schemas) + (limit,)).fetchall()
+    # Una fila en ambas bases (a mitad de un archivado) aparece una sola vez
+    results, seen = [], set()
+    for kind, item_id, epic_id, title, week, status, score in rows:
+        if (kind, item_id) not in seen:
+            seen.add((kind, item_id))
+            results.append({'type': kind, 'id': item_id, 'epic_id': epic_id, 'title': title,
+                             'week': week, 'status': status, 'score': score})
+    return results
+
+# ---- HISTORIAL DE ESTADOS ----
+DONE_STATUS = {'task': 'Completado', 'epic': 'Hecho'}
+
+def _events_range(start, end):
+    """Condición y parámetros SQL para filtrar status_events por rango de semanas ISO"""
+    if start and end:
+        return "AND d.changed_at >= ? AND d.changed_at < ?", week_bounds(start, end)
+    return "", ()
+
+def _iso_week_of(day):
+    iso = datetime.date.fromisoformat(day[:10]).isocalendar()
+    return iso[0], iso[1]
+
+@instrumented
+@cached_read
+def get_status_history(entity, entity_id):
+    """Cambios de estado de una épica ('epic') o tarea ('task') en orden cronológico"""
+    with get_connection() as conn:
+        return conn.execute("""
+            SELECT from_status, to_status, changed_at FROM status_events
+            WHERE entity = ? AND entity_id = ?
+            ORDER BY changed_at, id
+        """, (entity, entity_id)).fetchall()
+
+@instrumented
+@cached_read
+def get_burndown(week, include_archive=True):
+    """
+    Tareas pendientes por día para las épicas de una semana
+
+    Cada evento de tarea suma al alcance al crearse o reabrirse y resta al completarse.
+    El borrado (to_status NULL) saca del alcance a la tarea si no estaba completada.
+    Los eventos quedan en la base caliente también para las semanas archivadas.
+    Retorna tuplas (fecha, tareas_restantes) en orden cronológico.
+    """
+    with get_connection() as conn:
+        rows = conn.execute(f"""
+            SELECT date(ev.changed_at) AS day,
+                   SUM(CASE WHEN ev.to_status IS NULL THEN -(ev.from_status IS NOT 'Completado')
+                            ELSE (ev.from_status IS NULL) + (ev.from_status IS 'Completado')
+                                 - (ev.to_status IS 'Completado') END)
+            FROM {_epics_source(conn, include_archive)} e
+            JOIN status_events ev ON ev.epic_id = e.id AND ev.entity = 'task'
+            WHERE e.week = ?
+            GROUP BY day
+            ORDER BY day
+        """, (week,)).fetchall()
+
+    burndown = []
+    remaining = 0
+    for day, delta in rows:
+        remaining += delta
+        burndown.append((day, remaining))
+    return burndown
+
+@instrumented
+@cached_read
+def get_throughput(start=None, end=None):
+    """
+    Tareas completadas por semana ISO (según la fecha del evento), opcionalmente en un rango
+
+    Cuenta cada paso a 'Completado', así que una tarea reabierta y vuelta a cerrar cuenta dos veces.
+
+    Retorna tuplas (iso_year, iso_week, tareas_completadas) en orden cronológico.
+    """
+    where, params = _events_range(start, end)
+    with get_connection() as conn:
+        rows = conn.execute(f"""
+            SELECT date(d.changed_at), COUNT(*)
+            FROM status_events d
+            WHERE d.entity = 'task' AND d.to_status = 'Completado' AND d.from_status IS NOT NULL {where}
+            GROUP BY 1
+        """, params).fetchall()
+
+    weekly = {}
+    for day, count in rows:
+        key = _iso_week_of(day)
+        weekly[key] = weekly.get(key, 0) + count
+    return [(year, week, count) for (year, week), count in sorted(weekly.items())]
+
+@instrumented
+@cached_read
+def get_cycle_times(start=None, end=None, entity='task'):
+    """
+    Tiempo de ciclo medio (días) por semana ISO de finalización
+
+    El ciclo va desde el primer paso a 'En progreso' (o la creación si no lo hubo)
+    hasta el evento de finalización ('Completado' en tareas, 'Hecho' en épicas).
+    Retorna tuplas (iso_year, iso_week, finalizadas, días_promedio).
+    """
+    where, params = _events_range(start, end)
+    with get_connection() as conn:
+        rows = conn.execute(f"""
+            SELECT d.changed_at,
+                   julianday(d.changed_at) - julianday(COALESCE(
+                       MIN(CASE WHEN s.to_status = 'En progreso' THEN s.changed_at END),
+                       MIN(s.changed_at)))
+            FROM status_events d
+            JOIN status_events s
+              ON s.entity = d.entity AND s.entity_id = d.entity_id AND s.changed_at <= d.changed_at
+            WHERE d.entity = ? AND d.to_status = ? AND d.from_status IS NOT NULL {where}
+            GROUP BY d.id
+        """, (entity, DONE_STATUS[entity], *params)).fetchall()
+
+    weekly = {}
+    for done_at, days in rows:
+        key = _iso_week_of(done_at)
+        count, total_days = weekly.get(key, (0, 0.0))
+        weekly[key] = (count + 1, total_days + days)
+    return [(year, week, count, total_days / count)
+            for (year, week), (count, total_days) in sorted(weekly.items())]
+
+# ---- MÉTRICAS ----
+@instrumented
+@cached_read
+def get_weekly_progress(start=None, end=None, include_archive=True):
+    """
+    Progreso agregado por semana ISO (para tendencias), opcionalmente en un rango
+
+    Retorna tuplas (iso_year, iso_week, épicas, tareas_totales, tareas_completadas).
+    """
+    where = "WHERE (iso_year, iso_week) BETWEEN (?, ?) AND (?, ?)" if start and end else "WHERE iso_year IS NOT NULL"
+    params = (*start, *end) if start and end else ()
+    with get_connection() as conn:
+        return conn.execute(f"""
+            SELECT iso_year, iso_week, COUNT(*), SUM(tasks_total), SUM(tasks_completed)
+            FROM {_epics_source(conn, include_archive)}
+            {where}
+            GROUP BY iso_year, iso_week
+            ORDER BY iso_year, iso_week
+        """, params).fetchall()
+
+@instrumented
+@cached_read
+def get_epic_metrics(week=None, week_range=None, include_archive=True):
+    """
+    Calcula las métricas de épicas y tareas con una sola consulta sobre epics
+
+    El progreso sale de los contadores tasks_total/tasks_completed que mantienen
+    los triggers, así que no hace falta recorrer la tabla de tareas.
+
+    Args:
+        week: Semana a filtrar (None = todas las semanas); el filtro se aplica en SQL
+        week_range: Tupla ((año, semana), (año, semana)) para un rango de semanas ISO
+        include_archive: Incluir las semanas cerradas movidas al archivo histórico
+
+    Retorna el dict de métricas usado por los reportes: total_epics, pending,
+    in_progress, done, total_tasks, completed_tasks y epic_details (lista de Epic).
+    """
+    if week:
+        where, params = "WHERE e.week = ?", (week,)
+    elif week_range:
+        start, end = week_range
+        where, params = "WHERE (e.iso_year, e.iso_week) BETWEEN (?, ?) AND (?, ?)", (*start, *end)
+    else:
+        where, params = "", ()
+    with get_connection() as conn:
+        epics = Epic.fetch_all(conn.execute(f"""
+            SELECT {Epic.columns('e')}
+            FROM {_epics_source(conn, include_archive)} e
+            {where}
+            ORDER BY e.id DESC
+        """, params))
+
+    metrics = {
+        'total_epics': len(epics),
+        'pending': 0,
+        'in_progress': 0,
+        'done': 0,
+        'total_tasks': 0,
+        'completed_tasks': 0,
+        'epic_details': epics,
+    }
+    status_keys = {'Pendiente': 'pending', 'En progreso': 'in_progress', 'Hecho': 'done'}
+
+    for epic in epics:
+        if epic.status in status_keys:
+            metrics[status_keys[epic.status]] += 1
+        metrics['total_tasks'] += epic.tasks_total
+        metrics['completed_tasks'] += epic.tasks_completed
+
+    return metrics
+
+def _auto_complete_epic_if_tasks_done(conn, epic_id):
+    cursor = conn.execute("""
+        UPDATE epics SET status = 'Hecho'
+        WHERE id = ? AND tasks_total > 0 AND tasks_completed = tasks_total
+    """, (epic_id,))
+    return cursor.rowcount > 0
+
+@instrumented
+@invalidates_cache
 def auto_complete_epic_if_tasks_done(epic_id):
     """Cambia automáticamente la épica a 'Hecho' si todas las tareas están completadas"""
-    completed, total, percentage = get_task_completion_status(epic_id)
-    if total > 0 and percentage == 100:
-        update_epic_status(epic_id, "Hecho")
-        return True
-    return False
+    return _write(_auto_complete_epic_if_tasks_done, epic_id)
+
+def _apply_task_status_changes(conn, changes):
+    task_ids = [task_id for task_id, _ in changes]
+    placeholders = ", ".join("?" * len(task_ids))
+    conn.executemany("UPDATE tasks SET status = ? WHERE id = ? AND status IS NOT ?",
+                     [(status, task_id, status) for task_id, status in changes])
+    epic_ids = [row[0] for row in conn.execute(
+        f"SELECT DISTINCT epic_id FROM tasks WHERE id IN ({placeholders})", task_ids)]
+    # Los contadores ya reflejan los cambios (triggers), no hace falta contar tareas
+    return [epic_id for epic_id in epic_ids if conn.execute("""
+        UPDATE epics SET status = 'Hecho'
+        WHERE id = ? AND status IS NOT 'Hecho' AND tasks_total > 0 AND tasks_completed = tasks_total
+    """, (epic_id,)).rowcount > 0]
+
+@instrumented
+@invalidates_cache
+def apply_task_status_changes(changes):
+    """
+    Aplica varios cambios de estado de tareas y el autocompletado de sus épicas en una transacción
+
+    Args:
+        changes: Iterable de tuplas (task_id, nuevo_estado)
+
+    Retorna la lista de ids de épicas que pasaron a 'Hecho'.
+    """
+    changes = list(changes)
+    if not changes:
+        return []
+    return _write(_apply_task_status_changes, changes)
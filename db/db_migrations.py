@@ -0,0 +1,381 @@
+"""
+Migraciones versionadas del esquema de la base de datos
+La versión aplicada se guarda en PRAGMA user_version, así los roadmap.db existentes
+evolucionan en su sitio sin perder datos
+"""
+
+from db.db_weeks import parse_week_label
+
+def _backfill_iso_weeks(conn):
+    """Rellena iso_year/iso_week a partir de las etiquetas 'Semana NN - AAAA' existentes"""
+    rows = conn.execute("SELECT id, week FROM epics").fetchall()
+    conn.executemany("UPDATE epics SET iso_year = ?, iso_week = ? WHERE id = ?",
+                     [(*parse_week_label(week), epic_id) for epic_id, week in rows])
+
+
+# Cada migración es (versión, descripción, pasos). Un paso es una sentencia SQL
+# o una función que recibe la conexión. Las versiones deben ser consecutivas.
+MIGRATIONS = [
+    (1, "Índice de tareas por épica y estado", [
+        # Cubre get_tasks_by_epic (prefijo epic_id) y los COUNT de get_task_completion_status
+        "CREATE INDEX IF NOT EXISTS idx_tasks_epic_status ON tasks (epic_id, status)",
+    ]),
+    (2, "Índice de épicas por semana", [
+        "CREATE INDEX IF NOT EXISTS idx_epics_week ON epics (week)",
+    ]),
+    (3, "Contadores de tareas en epics mantenidos por triggers", [
+        "ALTER TABLE epics ADD COLUMN tasks_total INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE epics ADD COLUMN tasks_completed INTEGER NOT NULL DEFAULT 0",
+        """
+        UPDATE epics SET
+            tasks_total = (SELECT COUNT(*) FROM tasks WHERE tasks.epic_id = epics.id),
+            tasks_completed = (SELECT COUNT(*) FROM tasks
+                               WHERE tasks.epic_id = epics.id AND tasks.status = 'Completado')
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_counters_insert AFTER INSERT ON tasks
+        BEGIN
+            UPDATE epics SET tasks_total = tasks_total + 1,
+                             tasks_completed = tasks_completed + (NEW.status = 'Completado')
+            WHERE id = NEW.epic_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_counters_delete AFTER DELETE ON tasks
+        BEGIN
+            UPDATE epics SET tasks_total = tasks_total - 1,
+                             tasks_completed = tasks_completed - (OLD.status = 'Completado')
+            WHERE id = OLD.epic_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_counters_update AFTER UPDATE OF status, epic_id ON tasks
+        BEGIN
+            UPDATE epics SET tasks_total = tasks_total - 1,
+                             tasks_completed = tasks_completed - (OLD.status = 'Completado')
+            WHERE id = OLD.epic_id;
+            UPDATE epics SET tasks_total = tasks_total + 1,
+                             tasks_completed = tasks_completed + (NEW.status = 'Completado')
+            WHERE id = NEW.epic_id;
+        END
+        """,
+    ]),
+    (4, "Prioridad de tareas como rango entero con índice de orden", [
+        # 1 = Alta, 2 = Media, 3 = Baja (ver PRIORITY_RANKS en db_models)
+        "ALTER TABLE tasks ADD COLUMN priority_rank INTEGER NOT NULL DEFAULT 2",
+        """
+        UPDATE tasks SET priority_rank = CASE priority
+            WHEN 'Alta' THEN 1 WHEN 'Media' THEN 2 WHEN 'Baja' THEN 3 ELSE 2 END
+        """,
+        # Da el orden de get_tasks_by_epic sin ordenar aparte; no es cubriente (las columnas salen de la tabla)
+        "CREATE INDEX IF NOT EXISTS idx_tasks_epic_priority ON tasks (epic_id, priority_rank, id)",
+    ]),
+    (5, "Índice de búsqueda de texto completo (FTS5) sobre épicas y tareas", [
+        # Tablas FTS de contenido externo: el texto vive en epics/tasks y solo se indexa aquí
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS epics_fts USING fts5(
+            name, description,
+            content='epics', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """,
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+            title, description, owner,
+            content='tasks', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """,
+        "INSERT INTO epics_fts (epics_fts) VALUES ('rebuild')",
+        "INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_epics_fts_insert AFTER INSERT ON epics
+        BEGIN
+            INSERT INTO epics_fts (rowid, name, description) VALUES (NEW.id, NEW.name, NEW.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_epics_fts_delete AFTER DELETE ON epics
+        BEGIN
+            INSERT INTO epics_fts (epics_fts, rowid, name, description)
+            VALUES ('delete', OLD.id, OLD.name, OLD.description);
+        END
+        """,
+        # Solo al cambiar columnas indexadas, no con cada actualización de contadores o estado
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_epics_fts_update AFTER UPDATE OF name, description ON epics
+        BEGIN
+            INSERT INTO epics_fts (epics_fts, rowid, name, description)
+            VALUES ('delete', OLD.id, OLD.name, OLD.description);
+            INSERT INTO epics_fts (rowid, name, description) VALUES (NEW.id, NEW.name, NEW.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_fts_insert AFTER INSERT ON tasks
+        BEGIN
+            INSERT INTO tasks_fts (rowid, title, description, owner)
+            VALUES (NEW.id, NEW.title, NEW.description, NEW.owner);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_fts_delete AFTER DELETE ON tasks
+        BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description, owner)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.owner);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_fts_update AFTER UPDATE OF title, description, owner ON tasks
+        BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description, owner)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.owner);
+            INSERT INTO tasks_fts (rowid, title, description, owner)
+            VALUES (NEW.id, NEW.title, NEW.description, NEW.owner);
+        END
+        """,
+    ]),
+    (6, "Semana ISO estructurada (iso_year, iso_week) en epics", [
+        "ALTER TABLE epics ADD COLUMN iso_year INTEGER",
+        "ALTER TABLE epics ADD COLUMN iso_week INTEGER",
+        _backfill_iso_weeks,
+        "CREATE INDEX IF NOT EXISTS idx_epics_iso_week ON epics (iso_year, iso_week)",
+    ]),
+    (7, "Registro append-only de cambios de estado (status_events)", [
+        """
+        CREATE TABLE IF NOT EXISTS status_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity TEXT NOT NULL,
+            entity_id INTEGER NOT NULL,
+            epic_id INTEGER,
+            from_status TEXT,
+            to_status TEXT,
+            changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_status_events_entity_time ON status_events (entity, changed_at)",
+        "CREATE INDEX IF NOT EXISTS idx_status_events_entity_id ON status_events (entity, entity_id, changed_at)",
+        "CREATE INDEX IF NOT EXISTS idx_status_events_epic ON status_events (epic_id, changed_at)",
+        # La historia de las filas existentes empieza con su estado actual
+        """
+        INSERT INTO status_events (entity, entity_id, epic_id, from_status, to_status)
+        SELECT 'epic', id, id, NULL, status FROM epics
+        """,
+        """
+        INSERT INTO status_events (entity, entity_id, epic_id, from_status, to_status)
+        SELECT 'task', id, epic_id, NULL, status FROM tasks
+        """,
+        # Los triggers escriben el evento en la misma transacción que el cambio de estado
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_epics_status_insert AFTER INSERT ON epics
+        BEGIN
+            INSERT INTO status_events (entity, entity_id, epic_id, from_status, to_status)
+            VALUES ('epic', NEW.id, NEW.id, NULL, NEW.status);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_epics_status_update AFTER UPDATE OF status ON epics
+        WHEN OLD.status IS NOT NEW.status
+        BEGIN
+            INSERT INTO status_events (entity, entity_id, epic_id, from_status, to_status)
+            VALUES ('epic', NEW.id, NEW.id, OLD.status, NEW.status);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_status_insert AFTER INSERT ON tasks
+        BEGIN
+            INSERT INTO status_events (entity, entity_id, epic_id, from_status, to_status)
+            VALUES ('task', NEW.id, NEW.epic_id, NULL, NEW.status);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_status_update AFTER UPDATE OF status ON tasks
+        WHEN OLD.status IS NOT NEW.status
+        BEGIN
+            INSERT INTO status_events (entity, entity_id, epic_id, from_status, to_status)
+            VALUES ('task', NEW.id, NEW.epic_id, OLD.status, NEW.status);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_status_events_append_only BEFORE UPDATE ON status_events
+        BEGIN
+            SELECT RAISE(ABORT, 'status_events es append-only');
+        END
+        """,
+    ]),
+    (8, "Secuencia de cambios para la exportación incremental (ver db_export)", [
+        # Contador global: cada alta, cambio o borrado de épica o tarea toma el siguiente valor.
+        # Las escrituras están serializadas, así que el orden de la secuencia es el de los commits
+        "CREATE TABLE IF NOT EXISTS change_sequence (id INTEGER PRIMARY KEY CHECK (id = 1), value INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO change_sequence (id, value) VALUES (1, 0)",
+        "ALTER TABLE epics ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE tasks ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0",
+        "CREATE INDEX IF NOT EXISTS idx_epics_change_seq ON epics (change_seq)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_change_seq ON tasks (change_seq)",
+        # Las filas borradas dejan una marca para que la exportación incremental las quite
+        """
+        CREATE TABLE IF NOT EXISTS deleted_rows (
+            change_seq INTEGER PRIMARY KEY,
+            entity TEXT NOT NULL,
+            entity_id INTEGER NOT NULL
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_epics_change_insert AFTER INSERT ON epics
+        BEGIN
+            UPDATE change_sequence SET value = value + 1;
+            UPDATE epics SET change_seq = (SELECT value FROM change_sequence) WHERE id = NEW.id;
+        END
+        """,
+        # Sin change_seq en la lista de columnas: el propio UPDATE del trigger no lo vuelve a disparar
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_epics_change_update
+        AFTER UPDATE OF name, description, week, status, tasks_total, tasks_completed, iso_year, iso_week ON epics
+        BEGIN
+            UPDATE change_sequence SET value = value + 1;
+            UPDATE epics SET change_seq = (SELECT value FROM change_sequence) WHERE id = NEW.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_epics_change_delete AFTER DELETE ON epics
+        BEGIN
+            UPDATE change_sequence SET value = value + 1;
+            INSERT INTO deleted_rows (change_seq, entity, entity_id)
+            SELECT value, 'epic', OLD.id FROM change_sequence;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_change_insert AFTER INSERT ON tasks
+        BEGIN
+            UPDATE change_sequence SET value = value + 1;
+            UPDATE tasks SET change_seq = (SELECT value FROM change_sequence) WHERE id = NEW.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_change_update
+        AFTER UPDATE OF title, description, epic_id, owner, priority, priority_rank, status ON tasks
+        BEGIN
+            UPDATE change_sequence SET value = value + 1;
+            UPDATE tasks SET change_seq = (SELECT value FROM change_sequence) WHERE id = NEW.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_change_delete AFTER DELETE ON tasks
+        BEGIN
+            UPDATE change_sequence SET value = value + 1;
+            INSERT INTO deleted_rows (change_seq, entity, entity_id)
+            SELECT value, 'task', OLD.id FROM change_sequence;
+        END
+        """,
+    ]),
+    (9, "Evento de cierre al borrar épicas o tareas y status_events sin DELETE", [
+        # Un borrado cierra la historia con to_status NULL: get_burndown lo saca del alcance.
+        # status_events no tiene FOREIGN KEY, así que borrar la fila no borra sus eventos
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_epics_status_delete AFTER DELETE ON epics
+        BEGIN
+            INSERT INTO status_events (entity, entity_id, epic_id, from_status, to_status)
+            VALUES ('epic', OLD.id, OLD.id, OLD.status, NULL);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_tasks_status_delete AFTER DELETE ON tasks
+        BEGIN
+            INSERT INTO status_events (entity, entity_id, epic_id, from_status, to_status)
+            VALUES ('task', OLD.id, OLD.epic_id, OLD.status, NULL);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_status_events_no_delete BEFORE DELETE ON status_events
+        BEGIN
+            SELECT RAISE(ABORT, 'status_events es append-only');
+        END
+        """,
+    ]),
+    (10, "Los movimientos al archivo no cuentan como borrados (tabla bandera archive_move)", [
+        # db_archive inserta la fila bandera en la misma transacción que borra lo archivado y la
+        # quita antes del commit, así que nunca es visible para otras conexiones. Mientras existe,
+        # los triggers de borrado no registran evento de cierre ni marca en deleted_rows.
+        # (Un trigger de main no puede leer tablas TEMP, por eso la bandera vive en main)
+        "CREATE TABLE IF NOT EXISTS archive_move (id INTEGER PRIMARY KEY CHECK (id = 1))",
+        "DROP TRIGGER IF EXISTS trg_epics_status_delete",
+        "DROP TRIGGER IF EXISTS trg_tasks_status_delete",
+        "DROP TRIGGER IF EXISTS trg_epics_change_delete",
+        "DROP TRIGGER IF EXISTS trg_tasks_change_delete",
+        """
+        CREATE TRIGGER trg_epics_status_delete AFTER DELETE ON epics
+        WHEN NOT EXISTS (SELECT 1 FROM archive_move)
+        BEGIN
+            INSERT INTO status_events (entity, entity_id, epic_id, from_status, to_status)
+            VALUES ('epic', OLD.id, OLD.id, OLD.status, NULL);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_tasks_status_delete AFTER DELETE ON tasks
+        WHEN NOT EXISTS (SELECT 1 FROM archive_move)
+        BEGIN
+            INSERT INTO status_events (entity, entity_id, epic_id, from_status, to_status)
+            VALUES ('task', OLD.id, OLD.epic_id, OLD.status, NULL);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_epics_change_delete AFTER DELETE ON epics
+        WHEN NOT EXISTS (SELECT 1 FROM archive_move)
+        BEGIN
+            UPDATE change_sequence SET value = value + 1;
+            INSERT INTO deleted_rows (change_seq, entity, entity_id)
+            SELECT value, 'epic', OLD.id FROM change_sequence;
+        END
+        """,
+        """
+        CREATE TRIGGER trg_tasks_change_delete AFTER DELETE ON tasks
+        WHEN NOT EXISTS (SELECT 1 FROM archive_move)
+        BEGIN
+            UPDATE change_sequence SET value = value + 1;
+            INSERT INTO deleted_rows (change_seq, entity, entity_id)
+            SELECT value, 'task', OLD.id FROM change_sequence;
+        END
+        """,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    """Retorna la versión de esquema registrada en la base de datos"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, target=LATEST_VERSION):
+    """
+    Aplica las migraciones pendientes hasta la versión indicada
+
+    Cada migración corre en su propia transacción junto con el cambio de
+    user_version, de modo que un fallo deja la base en la última versión completa.
+    La versión se vuelve a leer con el bloqueo tomado: si otra conexión (otra sesión
+    que arrancó a la vez) ya aplicó la migración, se salta.
+    Retorna la lista de versiones aplicadas.
+    """
+    current = get_schema_version(conn)
+    applied = []
+    for version, description, steps in MIGRATIONS:
+        if version <= current or version > target:
+            continue
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        current = get_schema_version(conn)
+        if version <= current:
+            conn.rollback()
+            continue
+        try:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
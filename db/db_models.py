@@ -0,0 +1,82 @@
+"""
+Modelos de filas de épicas y tareas
+Clases ligeras con __slots__ que el cursor construye directamente (row_factory). Cada
+consulta proyecta las columnas del modelo de forma explícita, así agregar una columna a
+la tabla no cambia lo que reciben el tablero y los reportes.
+"""
+
+# Las prioridades se guardan como rango entero (menor = más importante)
+PRIORITY_RANKS = {"Alta": 1, "Media": 2, "Baja": 3}
+PRIORITY_LABELS = {rank: label for label, rank in PRIORITY_RANKS.items()}
+
+
+class Model:
+    __slots__ = ()
+    FIELDS = ()
+
+    @classmethod
+    def columns(cls, alias=None):
+        """Lista de columnas para el SELECT, en el orden de los campos ('e.id, e.name, ...' con alias)"""
+        prefix = f"{alias}." if alias else ""
+        return ", ".join(prefix + field for field in cls.FIELDS)
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        return cls(*row)
+
+    @classmethod
+    def fetch_all(cls, cursor):
+        """Lee todas las filas de un cursor (que seleccionó cls.columns()) como instancias"""
+        cursor.row_factory = cls.row_factory
+        return cursor.fetchall()
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id={self.id!r}, {self.FIELDS[1]}={getattr(self, self.FIELDS[1])!r})"
+
+
+class Epic(Model):
+    FIELDS = ('id', 'name', 'description', 'week', 'status', 'tasks_total', 'tasks_completed', 'iso_year', 'iso_week')
+    __slots__ = FIELDS + ('tasks', 'archived')
+
+    def __init__(self, id, name, description, week, status, tasks_total=0, tasks_completed=0,
+                 iso_year=None, iso_week=None):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.week = week
+        self.status = status
+        self.tasks_total = tasks_total
+        self.tasks_completed = tasks_completed
+        self.iso_year = iso_year
+        self.iso_week = iso_week
+        self.tasks = []  # solo get_board_data las carga
+        self.archived = False  # get_board_data marca las que vienen del archivo histórico
+
+    @property
+    def progress_percentage(self):
+        return (self.tasks_completed / self.tasks_total) * 100 if self.tasks_total else 0
+
+
+class Task(Model):
+    FIELDS = ('id', 'title', 'description', 'epic_id', 'owner', 'priority_rank', 'status')
+    __slots__ = FIELDS
+
+    def __init__(self, id, title, description, epic_id, owner, priority_rank, status):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.epic_id = epic_id
+        self.owner = owner
+        self.priority_rank = priority_rank
+        self.status = status
+
+    @property
+    def priority(self):
+        return PRIORITY_LABELS[self.priority_rank]
+
+    @property
+    def completed(self):
+        return self.status == "Completado"
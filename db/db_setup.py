@@ -1,7 +1,9 @@
 import sqlite3
+from db.db_backend import get_db_path
+from db.db_migrations import migrate
 
-def init_db():
-    conn = sqlite3.connect("roadmap.db")
+def create_tables(conn):
+    """Crea las tablas base (versión 0 del esquema) si no existen"""
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -29,6 +31,19 @@ def init_db():
     """)
 
     conn.commit()
+
+def init_db(db_path=None):
+    """Crea o actualiza la base de datos (por defecto la del backend configurado)"""
+    conn = sqlite3.connect(db_path or get_db_path(), uri=True)
+    conn.execute("PRAGMA foreign_keys = ON")
+    # Solo en un archivo recién creado (sin páginas): en una base existente el PRAGMA
+    # escribe en el archivo en cada llamada y sube data_version, lo que vaciaría la
+    # caché de lecturas en cada rerun. Las bases antiguas las convierte db_maintenance
+    if conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    create_tables(conn)
+    # Llevar el esquema a la última versión (índices, columnas nuevas, ...)
+    migrate(conn)
     conn.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,54 @@
+"""
+Utilidades de semanas ISO
+Convierte entre las etiquetas "Semana 40 - 2025" y pares (iso_year, iso_week)
+"""
+
+import datetime
+import re
+
+WEEK_LABEL_RE = re.compile(r"^\s*Semana\s+(\d{1,2})\s*-\s*(\d{4})\s*$")
+
+
+def parse_week_label(label):
+    """Retorna (iso_year, iso_week) de una etiqueta 'Semana NN - AAAA' o (None, None)"""
+    match = WEEK_LABEL_RE.match(label or "")
+    if not match:
+        return None, None
+    iso_week, iso_year = int(match.group(1)), int(match.group(2))
+    return iso_year, iso_week
+
+
+def format_week_label(iso_year, iso_week):
+    """Etiqueta legible de una semana ISO"""
+    return f"Semana {iso_week} - {iso_year}"
+
+
+def current_week(today=None):
+    """Semana ISO (año, semana) de hoy o de la fecha indicada"""
+    iso = (today or datetime.date.today()).isocalendar()
+    return iso[0], iso[1]
+
+
+def shift_week(iso_year, iso_week, delta):
+    """Suma `delta` semanas a una semana ISO (admite cambios de año)"""
+    monday = datetime.date.fromisocalendar(iso_year, iso_week, 1)
+    return current_week(monday + datetime.timedelta(weeks=delta))
+
+
+def last_weeks(n, today=None):
+    """Rango ((año, semana) inicial, (año, semana) final) de las últimas n semanas, incluida la actual"""
+    end = current_week(today)
+    return shift_week(*end, -(n - 1)), end
+
+
+def week_window(before=2, after=4, today=None):
+    """Semanas alrededor de la actual, en orden cronológico"""
+    now = current_week(today)
+    return [shift_week(*now, delta) for delta in range(-before, after + 1)]
+
+
+def week_bounds(start, end):
+    """Fechas ISO [lunes de start, lunes siguiente a end) para filtrar timestamps por rango de semanas"""
+    first = datetime.date.fromisocalendar(*start, 1)
+    after_last = datetime.date.fromisocalendar(*end, 1) + datetime.timedelta(weeks=1)
+    return first.isoformat(), after_last.isoformat()
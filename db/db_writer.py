@@ -0,0 +1,230 @@
+"""
+Escritor único de la base de datos
+Un hilo por base de datos es dueño de la única conexión que escribe y vacía una cola de
+escrituras. Lo que se acumula mientras se confirma un lote entra en el siguiente, así
+muchos clics a la vez se convierten en pocos commits en lugar de en esperas por el lock.
+Cada escritura corre en su propio SAVEPOINT: si una falla, solo se deshace esa.
+Las tareas que necesitan sus propias transacciones (archivo, mantenimiento, restauración)
+escriben con el escritor en pausa (ver exclusive).
+"""
+
+import os
+import queue
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import Future
+
+from db.db_connection import get_pool
+from db.db_cache import get_cache
+
+WRITER_ENABLED = os.getenv('ROADMAP_DB_WRITER', '1') == '1'
+WRITER_BATCH_SIZE = int(os.getenv('ROADMAP_DB_WRITER_BATCH_SIZE', 64))  # escrituras máximas por commit
+
+_STOP = object()
+
+
+class WriteRequest:
+    __slots__ = ('context', 'op', 'args', 'kwargs', 'future')
+
+    def __init__(self, op, args, kwargs):
+        # El contexto del que llama: la escritura cuenta en su sesión de instrumentación
+        self.context = contextvars.copy_context()
+        self.op = op
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+
+
+class PauseRequest:
+    __slots__ = ('paused', 'resume')
+
+    def __init__(self):
+        self.paused = threading.Event()
+        self.resume = threading.Event()
+
+
+class SingleWriter:
+    def __init__(self, db_path, batch_size=WRITER_BATCH_SIZE):
+        """
+        Arranca el hilo escritor de una base de datos
+
+        Args:
+            db_path: Ruta (o URI) de la base de datos
+            batch_size: Escrituras máximas confirmadas en un mismo commit
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.stats = {'writes': 0, 'batches': 0, 'errors': 0}
+        self._queue = queue.Queue()
+        self._closed = False
+        self._conn = get_pool(db_path).dedicated_connection()
+        self._thread = threading.Thread(target=self._run, name="roadmap-db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, op, *args, **kwargs):
+        """
+        Encola op(conn, *args, **kwargs) y retorna un Future con su resultado
+
+        op recibe la conexión del escritor y no debe abrir ni confirmar transacciones;
+        el Future se resuelve después del commit del lote.
+        """
+        if self._closed:
+            raise RuntimeError(f"El escritor de {self.db_path} está cerrado")
+        request = WriteRequest(op, args, kwargs)
+        self._queue.put(request)
+        return request.future
+
+    def _next_batch(self):
+        """
+        Espera la primera escritura y suma las que ya estén en cola
+
+        Retorna (lote, control): control es None, _STOP o la PauseRequest que cortó el lote.
+        """
+        batch = []
+        item = self._queue.get()
+        while isinstance(item, WriteRequest):
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                return batch, None
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return batch, None
+        return batch, item
+
+    def _run(self):
+        try:
+            while True:
+                batch, control = self._next_batch()
+                if batch:
+                    self._commit(batch)
+                if control is _STOP:
+                    break
+                if control is not None:
+                    # Lo encolado antes de la pausa ya está confirmado; esperar a que termine
+                    control.paused.set()
+                    control.resume.wait()
+        finally:
+            self._conn.close()
+
+    def _commit(self, batch):
+        batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        conn = self._conn
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for request in batch:
+                conn.execute("SAVEPOINT roadmap_write")
+                try:
+                    outcomes.append((True, request.context.run(request.op, conn, *request.args, **request.kwargs)))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO roadmap_write")
+                    outcomes.append((False, e))
+                conn.execute("RELEASE roadmap_write")
+            conn.commit()
+        except Exception as e:
+            # El lote entero no se pudo confirmar: ninguna de sus escrituras quedó guardada
+            if conn.in_transaction:
+                conn.rollback()
+            self.stats['errors'] += len(batch)
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        get_cache(self.db_path).invalidate()
+        self.stats['batches'] += 1
+        self.stats['writes'] += len(batch)
+        for request, (ok, value) in zip(batch, outcomes):
+            if ok:
+                request.future.set_result(value)
+            else:
+                self.stats['errors'] += 1
+                request.future.set_exception(value)
+
+    @contextmanager
+    def paused(self):
+        """
+        Confirma lo que ya está en cola y detiene el escritor mientras dura el bloque
+
+        Las escrituras que lleguen mientras tanto esperan en la cola. Dentro del bloque no
+        se puede escribir a través del escritor (se bloquearía esperando la pausa).
+        """
+        if self._closed:
+            raise RuntimeError(f"El escritor de {self.db_path} está cerrado")
+        request = PauseRequest()
+        self._queue.put(request)
+        request.paused.wait()
+        try:
+            yield
+        finally:
+            request.resume.set()
+
+    def close(self):
+        """Confirma lo que quede en la cola y detiene el hilo"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def uses_writer(db_path):
+    """
+    Indica si las escrituras a esta base pasan por el escritor único
+
+    Las bases en memoria con caché compartida quedan fuera: sus locks son por tabla y un
+    lote abierto haría fallar a los lectores en vez de hacerlos esperar.
+    """
+    return WRITER_ENABLED and "mode=memory" not in db_path
+
+
+def get_writer(db_path):
+    """Devuelve el escritor de una base de datos, arrancándolo si no existe"""
+    writer = _writers.get(db_path)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(db_path)
+            if writer is None:
+                writer = SingleWriter(db_path)
+                _writers[db_path] = writer
+    return writer
+
+
+@contextmanager
+def exclusive(db_path):
+    """
+    Pausa el escritor único de una base mientras dura el bloque
+
+    Para las tareas que escriben con sus propias transacciones en una conexión del pool
+    (archive_closed_weeks, run_maintenance, restore_snapshot): así no compiten por el
+    lock con un commit en grupo ni rompen la regla de un solo escritor a la vez.
+    """
+    if not uses_writer(db_path):
+        yield
+        return
+    with get_writer(db_path).paused():
+        yield
+
+
+def close_writer(db_path):
+    """Detiene el escritor de una base de datos tras confirmar su cola (antes de cerrar o borrar la base)"""
+    with _writers_lock:
+        writer = _writers.pop(db_path, None)
+    if writer is not None:
+        writer.close()
+
+
+def close_writers():
+    """Detiene todos los escritores (útil al terminar scripts o pruebas)"""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
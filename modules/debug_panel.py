@@ -0,0 +1,39 @@
+import streamlit as st
+from db.db_manager import get_epics_page, get_epic_count_by_week
+
+def show_debug_panel():
+    """Panel de debug paginado; solo consulta la base de datos cuando se activa"""
+    if not st.checkbox("Cargar datos de debug", key="debug_load"):
+        st.caption("Activa la casilla para consultar la base de datos")
+        return
+
+    # Contador por semana
+    week_counts = get_epic_count_by_week()
+    st.write(f"**Total de épicas en la base de datos:** {sum(count for _, count in week_counts)}")
+
+    if not week_counts:
+        st.warning("⚠️ No hay épicas en la base de datos")
+        return
+
+    st.write("**Épicas por semana:**")
+    st.dataframe([{"Semana": w, "Épicas": count} for w, count in week_counts], hide_index=True)
+
+    # Cursores de las páginas visitadas (None = primera página)
+    cursors = st.session_state.setdefault("debug_cursors", [None])
+    epics, next_cursor = get_epics_page(after_id=cursors[-1])
+
+    st.write(f"**Todas las épicas (página {len(cursors)}):**")
+    st.dataframe(
+        [{"ID": e.id, "Nombre": e.name, "Semana": e.week, "Estado": e.status} for e in epics],
+        hide_index=True
+    )
+
+    col_prev, col_next = st.columns(2)
+    with col_prev:
+        if st.button("⬅️ Anterior", disabled=len(cursors) == 1, key="debug_prev"):
+            cursors.pop()
+            st.rerun()
+    with col_next:
+        if st.button("Siguiente ➡️", disabled=next_cursor is None, key="debug_next"):
+            cursors.append(next_cursor)
+            st.rerun()
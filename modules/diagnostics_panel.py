@@ -0,0 +1,59 @@
+import json
+import streamlit as st
+from db.db_instrumentation import ENABLED, start_session, end_session
+
+HISTORY_SIZE = 10
+
+def start_rerun_diagnostics():
+    """Abre la sesión de instrumentación de este rerun si el diagnóstico está activo (llamar al inicio de app.py)"""
+    if not st.session_state.get("diagnostics_enabled", ENABLED):
+        return
+    history = st.session_state.setdefault("diagnostics_history", [])
+    history.append(start_session("rerun"))
+    del history[:-HISTORY_SIZE]
+
+def _session_label(session):
+    elapsed = f"{session.elapsed_ms:.0f} ms" if session.elapsed_ms is not None else "cortado por st.rerun"
+    return f"{session.started_at:%H:%M:%S} · {session.statements} sentencias · {elapsed}"
+
+def show_diagnostics_panel():
+    """Panel lateral con las consultas de los últimos reruns (llamar al final de app.py)"""
+    with st.sidebar:
+        if not st.checkbox("🩺 Diagnóstico de consultas", value=ENABLED, key="diagnostics_enabled"):
+            return
+        # Cerrar la sesión del rerun actual antes de mostrarla
+        end_session()
+        history = st.session_state.get("diagnostics_history", [])
+        if not history:
+            st.caption("Interactúa con la app para registrar consultas")
+            return
+
+        st.dataframe([
+            {"Inicio": f"{s.started_at:%H:%M:%S}", "Sentencias": s.statements, "BD (ms)": round(s.db_ms, 1),
+             "Total (ms)": round(s.elapsed_ms, 1) if s.elapsed_ms is not None else None, "Filas": s.rows}
+            for s in reversed(history)
+        ], hide_index=True)
+
+        index = st.selectbox("Detalle de:", list(reversed(range(len(history)))),
+                             format_func=lambda i: _session_label(history[i]), key="diagnostics_selected")
+        session = history[index]
+
+        st.markdown("**Por función:**")
+        st.dataframe([
+            {"Función": name, "Llamadas": stats['calls'], "Sentencias": stats['statements'],
+             "Total (ms)": round(stats['ms'], 2), "BD (ms)": round(stats['db_ms'], 2), "Filas": stats['rows']}
+            for name, stats in sorted(session.functions.items(), key=lambda item: -item[1]['ms'])
+        ], hide_index=True)
+
+        for child in session.children:
+            st.caption(f"📄 {child.label}: {child.statements} sentencias, {child.db_ms:.1f} ms en BD, "
+                       f"{child.elapsed_ms:.0f} ms en total")
+
+        if session.slow_statements:
+            st.markdown(f"**Sentencias lentas (≥ {session.slow_ms:.0f} ms):**")
+            for record in session.slow_statements:
+                st.code(f"-- {record.function}: {record.ms:.1f} ms, {record.rows} filas\n{record.sql}\n"
+                        + "\n".join(f"-- {detail}" for detail in record.plan or []), language="sql")
+
+        st.download_button("💾 Descargar JSON", data=json.dumps([s.to_dict() for s in history], ensure_ascii=False, indent=2),
+                           file_name="diagnostico_consultas.json", mime="application/json")
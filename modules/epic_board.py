@@ -1,8 +1,8 @@
 import streamlit as st
 from db.db_manager import (
-    get_epics_by_week, update_epic_status, delete_epic,
-    get_tasks_by_epic, create_task, update_task_status, delete_task,
-    get_task_completion_status, auto_complete_epic_if_tasks_done
+    get_board_data, update_epic_status, delete_epic,
+    create_task, delete_task, apply_task_status_changes,
+    BOARD_STATES
 )
 
 def show_epic_board(week):
@@ -12,32 +12,39 @@ def show_epic_board(week):
     if st.button("🔄 Actualizar tablero"):
         st.rerun()
 
-    epics = get_epics_by_week(week)
+    # Épicas, tareas y progreso de la semana en una sola consulta
+    board = get_board_data(week)
     
     # Mostrar contador de épicas
-    st.info(f"📊 Total de épicas en {week}: {len(epics)}")
+    total_epics = sum(len(epics) for epics in board.values())
+    st.info(f"📊 Total de épicas en {week}: {total_epics}")
     
     columns = st.columns(3)
-    states = ["Pendiente", "En progreso", "Hecho"]
+    states = BOARD_STATES
+
+    # Cambios de checkboxes de este rerun; se guardan todos juntos al final
+    pending_changes = []
 
     for i, state in enumerate(states):
         with columns[i]:
-            filtered_epics = [e for e in epics if e[4] == state]
+            filtered_epics = board[state]
             st.markdown(f"### {state} ({len(filtered_epics)})")
             
             if len(filtered_epics) == 0:
                 st.info(f"No hay épicas en estado '{state}'")
             
             for epic in filtered_epics:
-                epic_id = epic[0]
-                epic_name = epic[1]
-                epic_description = epic[2]
-                epic_week = epic[3]
-                epic_status = epic[4]
+                epic_id = epic.id
+                epic_name = epic.name
+                epic_description = epic.description
+                epic_week = epic.week
+                epic_status = epic.status
                 
-                # Obtener estadísticas de tareas
-                completed, total, percentage = get_task_completion_status(epic_id)
-                tasks = get_tasks_by_epic(epic_id)
+                # Estadísticas de tareas ya calculadas por get_board_data
+                completed = epic.tasks_completed
+                total = epic.tasks_total
+                percentage = epic.progress_percentage
+                tasks = epic.tasks
                 
                 with st.container():
                     # Crear una tarjeta visual más atractiva con barra de progreso
@@ -66,9 +73,9 @@ def show_epic_board(week):
                         st.markdown("**📝 Checklist de Tareas:**")
                         
                         # Mostrar tareas existentes
-                        task_updated = False
                         for task in tasks:
-                            task_id, task_title, task_desc, _, task_owner, task_priority, task_status = task
+                            task_id, task_title, task_desc = task.id, task.title, task.description
+                            task_status, task_priority = task.status, task.priority
                             task_key = f"task_{task_id}_{epic_id}"
                             
                             col_check, col_task, col_del = st.columns([1, 6, 1])
@@ -81,8 +88,7 @@ def show_epic_board(week):
                                 )
                                 if task_completed != (task_status == "Completado"):
                                     new_task_status = "Completado" if task_completed else "Pendiente"
-                                    update_task_status(task_id, new_task_status)
-                                    task_updated = True
+                                    pending_changes.append((task_id, new_task_status))
                             
                             with col_task:
                                 priority_emoji = "🔴" if task_priority == "Alta" else "🟡" if task_priority == "Media" else "🟢"
@@ -96,14 +102,6 @@ def show_epic_board(week):
                                     delete_task(task_id)
                                     st.rerun()
                         
-                        # Verificar si se completó automáticamente
-                        if task_updated:
-                            if auto_complete_epic_if_tasks_done(epic_id):
-                                st.success("🎉 ¡Todas las tareas completadas! Épica movida a 'Hecho'")
-                                st.rerun()
-                            else:
-                                st.rerun()
-                        
                         # Formulario para agregar nueva tarea
                         with st.expander("➕ Agregar nueva tarea"):
                             with st.form(f"task_form_{epic_id}"):
@@ -123,6 +121,12 @@ def show_epic_board(week):
                                     else:
                                         st.warning("El título es obligatorio")
                     
+                    # Las épicas del archivo histórico son de solo lectura
+                    if epic.archived:
+                        st.caption("🗄️ Archivada (solo lectura)")
+                        st.divider()
+                        continue
+
                     # Controles principales en columnas
                     col1, col2 = st.columns([3, 1])
                     
@@ -147,3 +151,11 @@ def show_epic_board(week):
                                 st.warning("⚠️ Haz clic de nuevo para confirmar eliminación")
                     
                     st.divider()
+
+    # Una sola transacción para todas las tareas marcadas y el autocompletado de sus épicas
+    if pending_changes:
+        for completed_epic_id in apply_task_status_changes(pending_changes):
+            # El selector "Mover a" aún recuerda el estado anterior: olvidarlo para no deshacer el cambio
+            st.session_state.pop(f"move_{completed_epic_id}", None)
+            st.toast("🎉 ¡Todas las tareas completadas! Épica movida a 'Hecho'")
+        st.rerun()
@@ -1,5 +1,6 @@
 import streamlit as st
-from db.db_manager import create_epic, create_task, get_all_epics
+from db.db_manager import create_epic_with_tasks, get_week_options
+from db.db_weeks import format_week_label, current_week
 
 def show_epic_form():
     st.subheader("➕ Crear nueva épica")
@@ -7,7 +8,9 @@ def show_epic_form():
     with st.form("epic_form"):
         name = st.text_input("Nombre de la épica")
         description = st.text_area("Descripción")
-        week = st.selectbox("Semana", ["Semana 40 - 2025", "Semana 41 - 2025", "Semana 42 - 2025"], index=0)
+        weeks = get_week_options()
+        this_week = format_week_label(*current_week())
+        week = st.selectbox("Semana", weeks, index=weeks.index(this_week))
         status = st.selectbox("Estado inicial", ["Pendiente", "En progreso", "Hecho"], index=0)
         
         # Sección para agregar tareas iniciales
@@ -36,17 +39,8 @@ def show_epic_form():
 
         if submitted:
             if name:
-                # Crear la épica
-                create_epic(name, description, week, status)
-                
-                # Obtener el ID de la épica recién creada
-                all_epics = get_all_epics()
-                new_epic_id = all_epics[0][0] if all_epics else None
-                
-                # Crear tareas iniciales si las hay
-                if new_epic_id and initial_tasks:
-                    for task in initial_tasks:
-                        create_task(task["title"], "", new_epic_id, task["owner"], task["priority"])
+                # Crear la épica y sus tareas iniciales en una sola transacción
+                create_epic_with_tasks(name, description, week, status, initial_tasks)
                 
                 task_count = len(initial_tasks)
                 success_msg = f"✅ Épica '{name}' creada para {week} con estado '{status}'"
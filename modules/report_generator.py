@@ -20,9 +20,11 @@ from reportlab.graphics.charts.barcharts import VerticalBarChart
 from reportlab.lib.colors import HexColor
 
 from db.db_manager import (
-    get_all_epics, get_tasks_by_epic, get_task_completion_status,
-    get_epic_count_by_week
+    get_tasks_by_epic, get_epic_metrics, get_throughput, get_cycle_times, reading_snapshot
 )
+from db.db_weeks import format_week_label, parse_week_label, last_weeks
+from db.db_instrumentation import session as db_session
+from db.db_async import submit
 
 class ReportGenerator:
     def __init__(self):
@@ -60,49 +62,29 @@ class ReportGenerator:
             alignment=1
         ))
 
-    def get_epic_metrics(self):
-        """Obtiene métricas generales de las épicas"""
-        all_epics = get_all_epics()
-        
-        metrics = {
-            'total_epics': len(all_epics),
-            'pending': 0,
-            'in_progress': 0,
-            'done': 0,
-            'total_tasks': 0,
-            'completed_tasks': 0,
-            'epic_details': []
-        }
-        
-        for epic in all_epics:
-            epic_id, name, description, week, status = epic
-            completed, total, percentage = get_task_completion_status(epic_id)
-            
-            # Contar épicas por estado
-            if status == 'Pendiente':
-                metrics['pending'] += 1
-            elif status == 'En progreso':
-                metrics['in_progress'] += 1
-            elif status == 'Hecho':
-                metrics['done'] += 1
-            
-            # Contar tareas
-            metrics['total_tasks'] += total
-            metrics['completed_tasks'] += completed
-            
-            # Detalles de épica
-            metrics['epic_details'].append({
-                'id': epic_id,
-                'name': name,
-                'description': description,
-                'week': week,
-                'status': status,
-                'tasks_completed': completed,
-                'tasks_total': total,
-                'progress_percentage': percentage
-            })
-        
-        return metrics
+    def get_epic_metrics(self, week=None, week_range=None, include_archive=True):
+        """Obtiene métricas generales de las épicas (opcionalmente de una semana o un rango)"""
+        return get_epic_metrics(week, week_range=week_range, include_archive=include_archive)
+
+    def get_trend_rows(self, week_filter=None, week_range=None, default_weeks=8):
+        """Filas de throughput y tiempo de ciclo por semana para la tabla de tendencias"""
+        if week_filter:
+            start = parse_week_label(week_filter)
+            if start[0] is None:
+                return []
+            week_range = (start, start)
+        elif not week_range:
+            week_range = last_weeks(default_weeks)
+        
+        throughput = {(year, week): count for year, week, count in get_throughput(*week_range)}
+        cycle_times = {(year, week): days for year, week, _, days in get_cycle_times(*week_range)}
+        
+        rows = [['Semana', 'Tareas completadas', 'Ciclo medio (días)']]
+        for key in sorted(set(throughput) | set(cycle_times)):
+            days = cycle_times.get(key)
+            rows.append([format_week_label(*key), str(throughput.get(key, 0)),
+                         f"{days:.1f}" if days is not None else '-'])
+        return rows
 
     def create_metrics_chart(self, metrics):
         """Crea gráfico de métricas de épicas"""
@@ -116,22 +98,32 @@ class ReportGenerator:
         ax1.pie(values, labels=states, colors=colors_pie, autopct='%1.1f%%', startangle=90)
         ax1.set_title('Distribución de Épicas por Estado', fontsize=14, fontweight='bold')
         
-        # Gráfico de barras - Progreso de tareas
-        weeks = list(set([epic['week'] for epic in metrics['epic_details']]))
-        week_progress = {}
-        
-        for week in weeks:
-            week_epics = [e for e in metrics['epic_details'] if e['week'] == week]
-            total_tasks = sum([e['tasks_total'] for e in week_epics])
-            completed_tasks = sum([e['tasks_completed'] for e in week_epics])
-            week_progress[week] = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-        
-        ax2.bar(range(len(weeks)), list(week_progress.values()), color='#45B7D1')
+        # Gráfico de barras - Progreso de tareas por semana ISO, en orden cronológico
+        week_totals = {}
+        for epic in metrics['epic_details']:
+            key = (epic.iso_year or 0, epic.iso_week or 0, epic.week)
+            total, completed = week_totals.get(key, (0, 0))
+            week_totals[key] = (total + epic.tasks_total, completed + epic.tasks_completed)
+        
+        weeks = sorted(week_totals)
+        week_progress = [(completed / total * 100) if total > 0 else 0
+                         for total, completed in (week_totals[w] for w in weeks)]
+        single_year = len({year for year, _, _ in weeks}) == 1
+        week_labels = []
+        for year, week, label in weeks:
+            if not week:
+                week_labels.append(label or 'Sin semana')
+            elif single_year:
+                week_labels.append(f"Semana {week}")
+            else:
+                week_labels.append(f"S{week} {year}")
+        
+        ax2.bar(range(len(weeks)), week_progress, color='#45B7D1')
         ax2.set_xlabel('Semanas')
         ax2.set_ylabel('% Progreso')
         ax2.set_title('Progreso de Tareas por Semana', fontsize=14, fontweight='bold')
         ax2.set_xticks(range(len(weeks)))
-        ax2.set_xticklabels([w.replace(' - 2025', '') for w in weeks], rotation=45)
+        ax2.set_xticklabels(week_labels, rotation=45)
         
         plt.tight_layout()
         
@@ -145,9 +137,9 @@ class ReportGenerator:
 
     def create_epic_progress_chart(self, metrics):
         """Crea gráfico de progreso individual de épicas"""
-        epic_names = [e['name'][:30] + '...' if len(e['name']) > 30 else e['name'] 
+        epic_names = [e.name[:30] + '...' if len(e.name) > 30 else e.name 
                      for e in metrics['epic_details']]
-        progress_values = [e['progress_percentage'] for e in metrics['epic_details']]
+        progress_values = [e.progress_percentage for e in metrics['epic_details']]
         
         fig, ax = plt.subplots(figsize=(12, len(epic_names) * 0.5 + 2))
         
@@ -175,8 +167,22 @@ class ReportGenerator:
         
         return img_buffer
 
-    def generate_report(self, week_filter=None, output_path=None):
-        """Genera el reporte completo en PDF"""
+    def generate_report(self, week_filter=None, output_path=None, week_range=None, include_archive=True,
+                        use_snapshot=False):
+        """
+        Genera el reporte completo en PDF (de una semana, un rango de semanas ISO o todo)
+
+        Con use_snapshot=True lee de un snapshot reciente de la base de datos y no
+        compite con las ediciones del tablero.
+        """
+        # Las consultas del reporte se miden en su propia sesión de instrumentación
+        with db_session("report"):
+            if use_snapshot:
+                with reading_snapshot():
+                    return self._build_report(week_filter, output_path, week_range, include_archive)
+            return self._build_report(week_filter, output_path, week_range, include_archive)
+
+    def _build_report(self, week_filter, output_path, week_range, include_archive):
         if output_path is None:
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             output_path = f"reports/roadmap_report_{timestamp}.pdf"
@@ -188,13 +194,13 @@ class ReportGenerator:
         doc = SimpleDocTemplate(output_path, pagesize=A4)
         story = []
         
-        # Obtener métricas
-        metrics = self.get_epic_metrics()
-        
-        # Filtrar por semana si se especifica
-        if week_filter:
-            metrics['epic_details'] = [e for e in metrics['epic_details'] 
-                                     if e['week'] == week_filter]
+        # Obtener métricas (el filtro de semana se aplica en la consulta)
+        metrics = self.get_epic_metrics(week_filter, week_range=week_range, include_archive=include_archive)
+
+        # Tendencias y tareas se leen en segundo plano mientras se dibujan los gráficos
+        trend_future = submit(self.get_trend_rows, week_filter, week_range)
+        tasks_futures = {epic.id: submit(get_tasks_by_epic, epic.id, include_archive=include_archive)
+                         for epic in metrics['epic_details']}
         
         # TÍTULO Y FECHA
         story.append(Paragraph("🚀 REPORTE DE ROADMAP SEMANAL", self.styles['CustomTitle']))
@@ -202,6 +208,10 @@ class ReportGenerator:
                               self.styles['Normal']))
         if week_filter:
             story.append(Paragraph(f"Filtrado por: {week_filter}", self.styles['Normal']))
+        elif week_range:
+            start, end = week_range
+            story.append(Paragraph(f"Filtrado por: {format_week_label(*start)} a {format_week_label(*end)}",
+                                   self.styles['Normal']))
         story.append(Spacer(1, 20))
         
         # RESUMEN EJECUTIVO
@@ -235,18 +245,36 @@ class ReportGenerator:
         story.append(summary_table)
         story.append(Spacer(1, 20))
         
+        # GRÁFICOS (se dibujan antes de esperar las consultas en curso)
+        chart_buffer = self.create_metrics_chart(metrics)
+        progress_buffer = self.create_epic_progress_chart(metrics) if metrics['epic_details'] else None
+
+        # TENDENCIAS (desde el registro de cambios de estado)
+        trend_data = trend_future.result()
+        if len(trend_data) > 1:
+            story.append(Paragraph("📉 TENDENCIAS", self.styles['CustomHeading']))
+            trend_table = Table(trend_data)
+            trend_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E86AB')),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black)
+            ]))
+            story.append(trend_table)
+            story.append(Spacer(1, 20))
+        
         # GRÁFICOS
         story.append(Paragraph("📈 ANÁLISIS VISUAL", self.styles['CustomHeading']))
         
         # Gráfico de métricas
-        chart_buffer = self.create_metrics_chart(metrics)
         chart_img = Image(chart_buffer, width=7*inch, height=3*inch)
         story.append(chart_img)
         story.append(Spacer(1, 20))
         
         # Gráfico de progreso individual
-        if metrics['epic_details']:
-            progress_buffer = self.create_epic_progress_chart(metrics)
+        if progress_buffer is not None:
             progress_img = Image(progress_buffer, width=7*inch, height=len(metrics['epic_details'])*0.3*inch + 2*inch)
             story.append(progress_img)
             story.append(Spacer(1, 20))
@@ -256,16 +284,16 @@ class ReportGenerator:
         
         for epic in metrics['epic_details']:
             # Título de épica
-            epic_title = f"📌 {epic['name']} ({epic['status']})"
+            epic_title = f"📌 {epic.name} ({epic.status})"
             story.append(Paragraph(epic_title, self.styles['Heading3']))
             
             # Información de la épica
             epic_info = [
                 ['Campo', 'Valor'],
-                ['Semana', epic['week']],
-                ['Estado', epic['status']],
-                ['Descripción', epic['description'] or 'Sin descripción'],
-                ['Progreso de Tareas', f"{epic['tasks_completed']}/{epic['tasks_total']} ({epic['progress_percentage']:.1f}%)"]
+                ['Semana', epic.week],
+                ['Estado', epic.status],
+                ['Descripción', epic.description or 'Sin descripción'],
+                ['Progreso de Tareas', f"{epic.tasks_completed}/{epic.tasks_total} ({epic.progress_percentage:.1f}%)"]
             ]
             
             epic_table = Table(epic_info, colWidths=[2*inch, 4*inch])
@@ -283,17 +311,16 @@ class ReportGenerator:
             story.append(epic_table)
             
             # Tareas de la épica
-            tasks = get_tasks_by_epic(epic['id'])
+            tasks = tasks_futures[epic.id].result()
             if tasks:
                 story.append(Paragraph("Tareas:", self.styles['Heading4']))
                 task_data = [['Tarea', 'Responsable', 'Prioridad', 'Estado']]
                 for task in tasks:
-                    task_id, title, desc, _, owner, priority, status = task
                     task_data.append([
-                        title[:40] + '...' if len(title) > 40 else title,
-                        owner or 'Sin asignar',
-                        priority,
-                        '✅' if status == 'Completado' else '⏳'
+                        task.title[:40] + '...' if len(task.title) > 40 else task.title,
+                        task.owner or 'Sin asignar',
+                        task.priority,
+                        '✅' if task.completed else '⏳'
                     ])
                 
                 task_table = Table(task_data, colWidths=[2.5*inch, 1.5*inch, 1*inch, 0.8*inch])
@@ -322,7 +349,7 @@ class ReportGenerator:
             recommendations.append("• El progreso general está por debajo del 50%. Revisar recursos y prioridades")
         
         blocked_epics = [e for e in metrics['epic_details'] 
-                        if e['status'] == 'En progreso' and e['progress_percentage'] == 0]
+                        if e.status == 'En progreso' and e.progress_percentage == 0]
         if blocked_epics:
             recommendations.append(f"• {len(blocked_epics)} épicas en progreso sin tareas completadas. Revisar posibles bloqueos")
         
@@ -355,19 +382,6 @@ def generate_full_report():
     generator = ReportGenerator()
     return generator.generate_report()
 
-def get_report_summary(week=None):
+def get_report_summary(week=None, week_range=None, include_archive=True):
     """Obtiene resumen rápido para mostrar en la interfaz"""
-    generator = ReportGenerator()
-    metrics = generator.get_epic_metrics()
-    
-    if week:
-        metrics['epic_details'] = [e for e in metrics['epic_details'] if e['week'] == week]
-        # Recalcular métricas filtradas
-        metrics['total_epics'] = len(metrics['epic_details'])
-        metrics['pending'] = len([e for e in metrics['epic_details'] if e['status'] == 'Pendiente'])
-        metrics['in_progress'] = len([e for e in metrics['epic_details'] if e['status'] == 'En progreso'])
-        metrics['done'] = len([e for e in metrics['epic_details'] if e['status'] == 'Hecho'])
-        metrics['total_tasks'] = sum([e['tasks_total'] for e in metrics['epic_details']])
-        metrics['completed_tasks'] = sum([e['tasks_completed'] for e in metrics['epic_details']])
-    
-    return metrics
\ No newline at end of file
+    return get_epic_metrics(week, week_range=week_range, include_archive=include_archive)
@@ -7,6 +7,13 @@ import os
 from datetime import datetime
 from modules.report_generator import ReportGenerator, generate_weekly_report, generate_full_report, get_report_summary
 from modules.email_sender import EmailSender, EMAIL_CONFIGS, get_default_recipients
+from db.db_manager import get_week_options
+from db.db_weeks import format_week_label, last_weeks
+
+def range_label(week_range):
+    """Texto de un rango de semanas ISO para la interfaz"""
+    start, end = week_range
+    return f"{format_week_label(*start)} a {format_week_label(*end)}"
 
 def show_reports_interface():
     """Muestra la interfaz completa de reportes"""
@@ -37,31 +44,42 @@ def show_report_generation():
         # Opciones de reporte
         report_type = st.radio(
             "Tipo de reporte:",
-            ["📅 Reporte por semana específica", "🌐 Reporte completo (todas las épicas)"]
+            ["📅 Reporte por semana específica", "📆 Reporte de las últimas semanas",
+             "🌐 Reporte completo (todas las épicas)"]
         )
         
         week_filter = None
+        week_range = None
         if report_type.startswith("📅"):
             week_filter = st.selectbox(
                 "Selecciona la semana:",
-                ["Semana 40 - 2025", "Semana 41 - 2025", "Semana 42 - 2025"]
+                get_week_options()
             )
+        elif report_type.startswith("📆"):
+            n_weeks = st.slider("Número de semanas:", min_value=2, max_value=26, value=6)
+            week_range = last_weeks(n_weeks)
         
         # Opciones adicionales
         st.markdown("**Opciones del reporte:**")
         include_charts = st.checkbox("📊 Incluir gráficos y análisis visual", value=True)
         include_tasks = st.checkbox("📝 Incluir detalle de tareas por épica", value=True)
         include_recommendations = st.checkbox("💡 Incluir recomendaciones automáticas", value=True)
+        include_archive = st.checkbox("🗄️ Incluir semanas archivadas", value=True)
+        use_snapshot = st.checkbox("📸 Generar desde un snapshot (no bloquea el tablero)", value=False)
+        report_options = {'include_archive': include_archive, 'use_snapshot': use_snapshot}
     
     with col2:
         # Vista previa de métricas
         st.markdown("**📊 Vista Previa de Métricas:**")
         
         if week_filter and report_type.startswith("📅"):
-            metrics = get_report_summary(week=week_filter)
+            metrics = get_report_summary(week=week_filter, include_archive=include_archive)
             week_display = week_filter
+        elif week_range:
+            metrics = get_report_summary(week_range=week_range, include_archive=include_archive)
+            week_display = range_label(week_range)
         else:
-            metrics = get_report_summary()
+            metrics = get_report_summary(include_archive=include_archive)
             week_display = "Todas las semanas"
         
         st.info(f"**Semana:** {week_display}")
@@ -90,9 +108,11 @@ def show_report_generation():
                     generator = ReportGenerator()
                     
                     if report_type.startswith("📅"):
-                        pdf_path, report_metrics = generator.generate_report(week_filter=week_filter)
+                        pdf_path, report_metrics = generator.generate_report(week_filter=week_filter, **report_options)
+                    elif week_range:
+                        pdf_path, report_metrics = generator.generate_report(week_range=week_range, **report_options)
                     else:
-                        pdf_path, report_metrics = generator.generate_report()
+                        pdf_path, report_metrics = generator.generate_report(**report_options)
                     
                     # Mostrar enlace de descarga
                     with open(pdf_path, "rb") as pdf_file:
@@ -110,7 +130,7 @@ def show_report_generation():
                     st.session_state.last_generated_report = {
                         'pdf_path': pdf_path,
                         'metrics': report_metrics,
-                        'week': week_filter,
+                        'week': week_filter or (range_label(week_range) if week_range else None),
                         'timestamp': datetime.now()
                     }
                     
@@ -128,14 +148,16 @@ def show_report_generation():
                         generator = ReportGenerator()
                         
                         if report_type.startswith("📅"):
-                            pdf_path, report_metrics = generator.generate_report(week_filter=week_filter)
+                            pdf_path, report_metrics = generator.generate_report(week_filter=week_filter, **report_options)
+                        elif week_range:
+                            pdf_path, report_metrics = generator.generate_report(week_range=week_range, **report_options)
                         else:
-                            pdf_path, report_metrics = generator.generate_report()
+                            pdf_path, report_metrics = generator.generate_report(**report_options)
                         
                         st.session_state.last_generated_report = {
                             'pdf_path': pdf_path,
                             'metrics': report_metrics,
-                            'week': week_filter,
+                            'week': week_filter or (range_label(week_range) if week_range else None),
                             'timestamp': datetime.now()
                         }
                         
@@ -484,7 +506,7 @@ def show_report_preview():
     # Selector de semana para preview
     preview_week = st.selectbox(
         "Selecciona semana para vista previa:",
-        [None] + ["Semana 40 - 2025", "Semana 41 - 2025", "Semana 42 - 2025"],
+        [None] + get_week_options(),
         format_func=lambda x: "Todas las semanas" if x is None else x
     )
     
@@ -520,16 +542,16 @@ def show_report_preview():
     st.markdown("#### 📋 Detalle de Épicas")
     
     for epic in metrics['epic_details']:
-        with st.expander(f"📌 {epic['name']} ({epic['status']})"):
+        with st.expander(f"📌 {epic.name} ({epic.status})"):
             col1, col2 = st.columns([2, 1])
             
             with col1:
-                st.write(f"**Descripción:** {epic['description'] or 'Sin descripción'}")
-                st.write(f"**Semana:** {epic['week']}")
+                st.write(f"**Descripción:** {epic.description or 'Sin descripción'}")
+                st.write(f"**Semana:** {epic.week}")
                 
-                if epic['tasks_total'] > 0:
-                    st.progress(epic['progress_percentage'] / 100)
-                    st.caption(f"Progreso: {epic['tasks_completed']}/{epic['tasks_total']} tareas")
+                if epic.tasks_total > 0:
+                    st.progress(epic.progress_percentage / 100)
+                    st.caption(f"Progreso: {epic.tasks_completed}/{epic.tasks_total} tareas")
             
             with col2:
                 # Indicador de estado
@@ -538,7 +560,7 @@ def show_report_preview():
                     'En progreso': '🟡',
                     'Hecho': '🟢'
                 }
-                st.markdown(f"### {status_colors.get(epic['status'], '⚪')} {epic['status']}")
+                st.markdown(f"### {status_colors.get(epic.status, '⚪')} {epic.status}")
     
     # Recomendaciones automáticas
     st.markdown("#### 💡 Recomendaciones")
@@ -0,0 +1,28 @@
+import streamlit as st
+from db.db_manager import search
+
+def _jump_to_week(week):
+    """Callback: selecciona la semana del resultado antes de dibujar el selector"""
+    st.session_state["selected_week"] = week
+
+def show_search_box():
+    """Buscador de épicas y tareas con saltos a la semana de cada resultado"""
+    query = st.text_input("🔎 Buscar épicas y tareas", key="search_query",
+                          placeholder="Nombre, descripción o responsable")
+    if not query:
+        return
+
+    results = search(query)
+    if not results:
+        st.info(f"Sin resultados para '{query}'")
+        return
+
+    st.caption(f"{len(results)} resultado{'s' if len(results) > 1 else ''} para '{query}'")
+    for result in results:
+        icon = "📋" if result["type"] == "epic" else "📝"
+        col_title, col_jump = st.columns([5, 1])
+        with col_title:
+            st.markdown(f"{icon} **{result['title']}** · {result['status']} · {result['week']}")
+        with col_jump:
+            st.button("Ir ➡️", key=f"search_{result['type']}_{result['id']}",
+                      on_click=_jump_to_week, args=(result["week"],))